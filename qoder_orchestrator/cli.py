@@ -17,6 +17,7 @@ from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from .config import load_config, OrchestratorConfig
 from .llm_client import create_llm_client
+from .llm_cache import LLMCache, SemanticLLMCache
 from .context_cache import ContextCache
 
 # Initial logging setup (will be reconfigured per orchestrator instance)
@@ -393,8 +394,24 @@ class Orchestrator:
         # Initialize LLM client
         self.llm_client = create_llm_client(
             provider=self.config.llm.provider,
-            timeout=self.config.execution.task_timeout
+            timeout=self.config.execution.task_timeout,
+            cache=self._create_llm_cache(),
+            cache_ttl_days=self.config.llm.cache_ttl_days,
+            max_context_chars=self.config.llm.max_context_chars
         )
+    
+    def _create_llm_cache(self) -> Optional[LLMCache]:
+        """Create the LLM response cache selected by the configuration."""
+        llm_config = self.config.llm
+        if not llm_config.cache_responses:
+            return None
+        
+        if llm_config.semantic_cache:
+            return SemanticLLMCache(
+                model_name=self.config.semantic_search.model_name,
+                similarity_threshold=llm_config.semantic_cache_threshold
+            )
+        return LLMCache()
 
     def _setup_logging(self):
         """Configure logging to use project directory."""
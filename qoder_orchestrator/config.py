@@ -20,6 +20,9 @@ class RetryConfig:
     max_attempts: int = 3
     backoff_factor: float = 2.0
     max_backoff: float = 300.0  # 5 minutes max
+    jitter: bool = True  # Randomize backoff ("full jitter") to spread concurrent retries
+    attempt_history_size: int = 1024  # Max retry attempt records kept in memory
+    # Error labels ("timeout", "network", "temporary") and/or exception classes
     retry_on_errors: list = field(default_factory=lambda: ["timeout", "network", "temporary"])
 
 
@@ -33,6 +36,11 @@ class LLMConfig:
     max_tokens: int = 4000  # Not used by Qoder CLI
     max_output_tokens: Optional[str] = None  # For Qoder: "16k" or "32k"
     timeout: int = 60
+    cache_responses: bool = False  # Reuse CLI responses for identical prompts
+    cache_ttl_days: int = 7
+    semantic_cache: bool = False  # Also reuse responses to near-identical prompts
+    semantic_cache_threshold: float = 0.97  # Minimum cosine similarity
+    max_context_chars: int = 0  # Summarize larger prompt contexts (0 disables)
 
 
 @dataclass
@@ -43,6 +51,8 @@ class SemanticSearchConfig:
     similarity_threshold: float = 0.5
     max_results: int = 5
     cache_embeddings: bool = True
+    cache_max_size: int = 10000  # Max cached embeddings (LRU eviction)
+    cache_max_age: int = 604800  # Discard on-disk cache older than this (7 days)
 
 
 @dataclass
@@ -61,6 +71,7 @@ class RollbackConfig:
     create_checkpoints: bool = True
     keep_checkpoints: int = 10
     auto_rollback_on_failure: bool = False
+    max_files_for_checkpoint: int = 50000  # Skip checkpoints in larger workspaces
 
 
 @dataclass
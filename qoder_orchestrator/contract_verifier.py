@@ -4,11 +4,13 @@ API contract verification for frontend/backend integration.
 Ensures contracts stay in sync across components.
 """
 
+import os
+import ast
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, Set
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field, asdict
 import logging
 
 logger = logging.getLogger(__name__)
@@ -43,17 +45,177 @@ class ContractMismatch:
     suggestion: str = ""
 
 
+_HTTP_METHOD_ATTRS = {"get", "post", "put", "delete", "patch"}
+
+# Bump when extraction output changes so cached contracts are re-extracted
+# (1: regex extractor, 2: AST extractor)
+_EXTRACTOR_VERSION = 2
+
+# Used only for backend files that fail to parse as Python
+_FASTAPI_ROUTE_RE = re.compile(
+    r'@app\.(get|post|put|delete|patch)\(["\']([^"\']+)["\']\)',
+    re.IGNORECASE
+)
+
+
+def _decorator_path(dec: ast.Call) -> Optional[str]:
+    """Get the literal route path from a route decorator call."""
+    candidates = list(dec.args[:1])
+    candidates.extend(kw.value for kw in dec.keywords if kw.arg in ("path", "rule"))
+    
+    for arg in candidates:
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            return arg.value
+    
+    return None
+
+
+def _decorator_methods(dec: ast.Call) -> List[str]:
+    """Get HTTP methods from a Flask-style ``route(..., methods=[...])`` call."""
+    for kw in dec.keywords:
+        if kw.arg == "methods" and isinstance(kw.value, (ast.List, ast.Tuple, ast.Set)):
+            return [
+                elt.value.upper() for elt in kw.value.elts
+                if isinstance(elt, ast.Constant) and isinstance(elt.value, str)
+            ]
+    
+    return ["GET"]
+
+
+def _dir_fingerprint(directory: Path) -> Tuple[int, int]:
+    """
+    Compute a cheap change fingerprint for a directory tree.
+    
+    Args:
+        directory: Directory to fingerprint
+        
+    Returns:
+        Tuple of (file count, newest mtime in ns across files and dirs)
+    """
+    count = 0
+    newest = 0
+    
+    for root, _, files in os.walk(directory):
+        # Directory mtimes catch renames and deletions
+        mtime = os.stat(root).st_mtime_ns
+        if mtime > newest:
+            newest = mtime
+        
+        for name in files:
+            try:
+                mtime = os.stat(os.path.join(root, name)).st_mtime_ns
+            except OSError:
+                continue
+            count += 1
+            if mtime > newest:
+                newest = mtime
+    
+    return count, newest
+
+
+def _contract_to_dict(contract: APIContract) -> Dict:
+    """Serialize a contract for the on-disk cache."""
+    return {
+        "component": contract.component,
+        "endpoints": {key: asdict(ep) for key, ep in contract.endpoints.items()},
+        "models": contract.models,
+    }
+
+
+def _contract_from_dict(data: Dict) -> APIContract:
+    """Rebuild a contract from its cached form."""
+    return APIContract(
+        component=data["component"],
+        endpoints={key: APIEndpoint(**ep) for key, ep in data.get("endpoints", {}).items()},
+        models=data.get("models", {}),
+    )
+
+
 class ContractExtractor:
     """Extracts API contracts from code."""
     
-    def __init__(self, project_dir: Path):
+    def __init__(self, project_dir: Path, cache_dir: Optional[Path] = None):
         """
         Initialize contract extractor.
         
         Args:
             project_dir: Project directory path
+            cache_dir: Directory for caching extracted contracts
         """
         self.project_dir = project_dir
+        self.cache_dir = cache_dir or project_dir / ".qoder-cache"
+        self._contract_cache: Optional[Dict[str, Dict]] = None
+    
+    def _load_cache(self) -> Dict[str, Dict]:
+        """Load cached contracts from disk (once per extractor)."""
+        if self._contract_cache is not None:
+            return self._contract_cache
+        
+        self._contract_cache = {}
+        cache_file = self.cache_dir / "contracts.json"
+        
+        if cache_file.exists():
+            try:
+                with open(cache_file, 'r') as f:
+                    self._contract_cache = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load contract cache: {e}")
+        
+        return self._contract_cache
+    
+    def _save_cache(self):
+        """Save cached contracts to disk."""
+        cache_file = self.cache_dir / "contracts.json"
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'w') as f:
+                json.dump(self._contract_cache, f)
+        except Exception as e:
+            logger.warning(f"Failed to save contract cache: {e}")
+    
+    def extract_cached(self, source_dir: Path, component: str) -> APIContract:
+        """
+        Extract contract from code, reusing the cached result if the
+        directory is unchanged since the last extraction.
+        
+        Args:
+            source_dir: Backend or frontend directory path
+            component: "backend" or "frontend"
+            
+        Returns:
+            APIContract
+        """
+        extract = (
+            self.extract_from_backend_code if component == "backend"
+            else self.extract_from_frontend_code
+        )
+        
+        cache = self._load_cache()
+        cache_key = f"{component}:{source_dir.resolve()}"
+        fingerprint = list(_dir_fingerprint(source_dir))
+        
+        entry = cache.get(cache_key)
+        if (
+            entry
+            and entry.get("extractor_version") == _EXTRACTOR_VERSION
+            and entry.get("fingerprint") == fingerprint
+        ):
+            try:
+                logger.debug(f"Contract cache hit for {source_dir}")
+                return _contract_from_dict(entry["contract"])
+            except (KeyError, TypeError) as e:
+                logger.debug(f"Ignoring invalid contract cache entry: {e}")
+        
+        contract = extract(source_dir)
+        cache[cache_key] = {
+            "extractor_version": _EXTRACTOR_VERSION,
+            "fingerprint": fingerprint,
+            "contract": _contract_to_dict(contract),
+        }
+        self._save_cache()
+        
+        return contract
     
     def extract_from_openapi(self, spec_file: Path) -> APIContract:
         """
@@ -109,27 +271,30 @@ class ContractExtractor:
         """
         contract = APIContract(component="backend")
         
-        # Simple pattern matching for common frameworks
-        # In production, use AST parsing
-        
         for py_file in backend_dir.rglob("*.py"):
             try:
                 with open(py_file, 'r') as f:
                     content = f.read()
                 
-                # Look for FastAPI route decorators
-                fastapi_routes = re.findall(
-                    r'@app\.(get|post|put|delete|patch)\(["\']([^"\']+)["\']\)',
-                    content,
-                    re.IGNORECASE
-                )
+                # Cheap pre-filter: files without decorators can't declare routes
+                if "@" not in content:
+                    continue
                 
-                for method, path in fastapi_routes:
-                    endpoint_key = f"{method.upper()} {path}"
+                try:
+                    routes = self._find_python_routes(content, str(py_file))
+                except SyntaxError:
+                    # Fall back to pattern matching for files that don't parse
+                    routes = [
+                        (method.upper(), path)
+                        for method, path in _FASTAPI_ROUTE_RE.findall(content)
+                    ]
+                
+                for method, path in routes:
+                    endpoint_key = f"{method} {path}"
                     if endpoint_key not in contract.endpoints:
                         contract.endpoints[endpoint_key] = APIEndpoint(
                             path=path,
-                            method=method.upper()
+                            method=method
                         )
                 
             except Exception as e:
@@ -138,6 +303,50 @@ class ContractExtractor:
         logger.info(f"Extracted {len(contract.endpoints)} endpoints from backend code")
         return contract
     
+    def _find_python_routes(self, content: str, filename: str) -> List[Tuple[str, str]]:
+        """
+        Find route decorators in Python source using the AST.
+        
+        Handles FastAPI-style ``@app.get("/path")`` / ``@router.post(path=...)``
+        and Flask-style ``@app.route("/path", methods=[...])`` on any object.
+        
+        Args:
+            content: Python source code
+            filename: File name for error reporting
+            
+        Returns:
+            List of (METHOD, path) tuples
+            
+        Raises:
+            SyntaxError: If the source can't be parsed
+        """
+        routes = []
+        tree = ast.parse(content, filename=filename)
+        
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            
+            for dec in node.decorator_list:
+                if not (isinstance(dec, ast.Call) and isinstance(dec.func, ast.Attribute)):
+                    continue
+                
+                attr = dec.func.attr.lower()
+                if attr not in _HTTP_METHOD_ATTRS and attr != "route":
+                    continue
+                
+                path = _decorator_path(dec)
+                if path is None:
+                    continue
+                
+                if attr == "route":
+                    for method in _decorator_methods(dec):
+                        routes.append((method, path))
+                else:
+                    routes.append((attr.upper(), path))
+        
+        return routes
+    
     def extract_from_frontend_code(self, frontend_dir: Path) -> APIContract:
         """
         Extract contract from frontend code (JavaScript/TypeScript).
@@ -208,36 +417,40 @@ class ContractVerifier:
         """
         mismatches = []
         
+        backend_endpoints = backend_contract.endpoints
+        frontend_endpoints = frontend_contract.endpoints
+        
+        # Key views support set operations without copying; sort the
+        # differences so reports are stable across runs
+        backend_keys = backend_endpoints.keys()
+        frontend_keys = frontend_endpoints.keys()
+        
         # Check for endpoints in frontend not in backend
-        for endpoint_key, frontend_endpoint in frontend_contract.endpoints.items():
-            if endpoint_key not in backend_contract.endpoints:
-                mismatches.append(ContractMismatch(
-                    endpoint_path=frontend_endpoint.path,
-                    mismatch_type="missing",
-                    backend_value=None,
-                    frontend_value=endpoint_key,
-                    severity="error",
-                    suggestion=f"Add endpoint {endpoint_key} to backend"
-                ))
+        for endpoint_key in sorted(frontend_keys - backend_keys):
+            mismatches.append(ContractMismatch(
+                endpoint_path=frontend_endpoints[endpoint_key].path,
+                mismatch_type="missing",
+                backend_value=None,
+                frontend_value=endpoint_key,
+                severity="error",
+                suggestion=f"Add endpoint {endpoint_key} to backend"
+            ))
         
         # Check for endpoints in backend not in frontend
-        for endpoint_key, backend_endpoint in backend_contract.endpoints.items():
-            if endpoint_key not in frontend_contract.endpoints:
-                mismatches.append(ContractMismatch(
-                    endpoint_path=backend_endpoint.path,
-                    mismatch_type="missing",
-                    backend_value=endpoint_key,
-                    frontend_value=None,
-                    severity="warning",
-                    suggestion=f"Endpoint {endpoint_key} not used by frontend"
-                ))
+        for endpoint_key in sorted(backend_keys - frontend_keys):
+            mismatches.append(ContractMismatch(
+                endpoint_path=backend_endpoints[endpoint_key].path,
+                mismatch_type="missing",
+                backend_value=endpoint_key,
+                frontend_value=None,
+                severity="warning",
+                suggestion=f"Endpoint {endpoint_key} not used by frontend"
+            ))
         
         # Check for schema mismatches (if available)
-        common_endpoints = set(backend_contract.endpoints.keys()) & set(frontend_contract.endpoints.keys())
-        
-        for endpoint_key in common_endpoints:
-            backend_ep = backend_contract.endpoints[endpoint_key]
-            frontend_ep = frontend_contract.endpoints[endpoint_key]
+        for endpoint_key in backend_keys & frontend_keys:
+            backend_ep = backend_endpoints[endpoint_key]
+            frontend_ep = frontend_endpoints[endpoint_key]
             
             # Compare methods
             if backend_ep.method != frontend_ep.method:
@@ -318,8 +531,8 @@ def verify_api_contracts(project_dir: Path) -> List[ContractMismatch]:
         frontend_dir = project_dir / "client"
     
     # Extract contracts
-    backend_contract = extractor.extract_from_backend_code(backend_dir) if backend_dir.exists() else APIContract("backend")
-    frontend_contract = extractor.extract_from_frontend_code(frontend_dir) if frontend_dir.exists() else APIContract("frontend")
+    backend_contract = extractor.extract_cached(backend_dir, "backend") if backend_dir.exists() else APIContract("backend")
+    frontend_contract = extractor.extract_cached(frontend_dir, "frontend") if frontend_dir.exists() else APIContract("frontend")
     
     # Verify
     mismatches = verifier.verify_contracts(backend_contract, frontend_contract)
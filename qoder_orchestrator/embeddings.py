@@ -5,15 +5,29 @@ Enables intelligent context retrieval based on task similarity.
 """
 
 import os
-import pickle
+import re
+import time
+import heapq
 import hashlib
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import Any, List, Dict, FrozenSet, Tuple, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
 import logging
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class DocIndex:
+    """L2-normalized document embedding matrix for a document set."""
+    names: List[str]
+    matrix: np.ndarray  # Shape (len(names), dim)
+    documents: Tuple[Tuple[str, str], ...]  # (name, content) pairs it was built from
+
 
 class EmbeddingManager:
     """Manages embeddings for semantic search."""
@@ -31,7 +45,13 @@ class EmbeddingManager:
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
         self.model = None
-        self.embeddings_cache: Dict[str, np.ndarray] = {}
+        self.embeddings_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        
+        # Document matrix from the last find_similar call
+        self._last_index: Optional[DocIndex] = None
+        
+        # Lowercased content and word set per document, keyed by content
+        self._doc_tokens: Dict[str, Tuple[str, FrozenSet[str]]] = {}
         
         if config.enabled:
             self._load_model()
@@ -60,27 +80,38 @@ class EmbeddingManager:
     
     def _load_cache(self):
         """Load cached embeddings from disk."""
-        cache_file = self.cache_dir / "embeddings.pkl"
+        cache_file = self.cache_dir / "embeddings.npz"
         
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'rb') as f:
-                    self.embeddings_cache = pickle.load(f)
-                logger.info(f"Loaded {len(self.embeddings_cache)} cached embeddings")
-            except Exception as e:
-                logger.warning(f"Failed to load embedding cache: {e}")
-                self.embeddings_cache = {}
+        if not cache_file.exists():
+            return
+        
+        # Drop stale caches rather than carrying them forever
+        if time.time() - cache_file.stat().st_mtime > self.config.cache_max_age:
+            logger.info("Embedding cache expired, discarding")
+            self.clear_cache()
+            return
+        
+        try:
+            with np.load(cache_file) as archive:
+                # Keep only the most recent entries if the limit was lowered
+                keys = archive.files[-self.config.cache_max_size:]
+                self.embeddings_cache = OrderedDict((key, archive[key]) for key in keys)
+            logger.info(f"Loaded {len(self.embeddings_cache)} cached embeddings")
+        except Exception as e:
+            logger.warning(f"Failed to load embedding cache: {e}")
+            self.embeddings_cache = OrderedDict()
     
     def _save_cache(self):
         """Save embeddings cache to disk."""
         if not self.config.cache_embeddings:
             return
         
-        cache_file = self.cache_dir / "embeddings.pkl"
+        cache_file = self.cache_dir / "embeddings.npz"
         
         try:
+            # Write through a file object so numpy doesn't append a suffix
             with open(cache_file, 'wb') as f:
-                pickle.dump(self.embeddings_cache, f)
+                np.savez(f, **self.embeddings_cache)
             logger.debug(f"Saved {len(self.embeddings_cache)} embeddings to cache")
         except Exception as e:
             logger.warning(f"Failed to save embedding cache: {e}")
@@ -101,6 +132,7 @@ class EmbeddingManager:
         # Check cache
         cache_key = self._get_cache_key(text)
         if cache_key in self.embeddings_cache:
+            self.embeddings_cache.move_to_end(cache_key)
             return self.embeddings_cache[cache_key]
         
         try:
@@ -110,6 +142,8 @@ class EmbeddingManager:
             # Cache it
             if self.config.cache_embeddings:
                 self.embeddings_cache[cache_key] = embedding
+                if len(self.embeddings_cache) > self.config.cache_max_size:
+                    self.embeddings_cache.popitem(last=False)
                 self._save_cache()
             
             return embedding
@@ -130,13 +164,79 @@ class EmbeddingManager:
         """
         embeddings = {}
         
+        if not self.config.enabled or not self.model:
+            return embeddings
+        
+        # Serve cached embeddings, collect the rest for a single batch encode
+        missing: Dict[str, List[str]] = {}
         for name, content in documents.items():
-            embedding = self.embed_text(content)
-            if embedding is not None:
+            cache_key = self._get_cache_key(content)
+            if cache_key in self.embeddings_cache:
+                self.embeddings_cache.move_to_end(cache_key)
+                embeddings[name] = self.embeddings_cache[cache_key]
+            else:
+                missing.setdefault(content, []).append(name)
+        
+        if not missing:
+            return embeddings
+        
+        try:
+            texts = list(missing)
+            encoded = self.model.encode(texts, convert_to_numpy=True)
+        except Exception as e:
+            logger.error(f"Failed to generate embeddings: {e}")
+            return embeddings
+        
+        for text, embedding in zip(texts, encoded):
+            for name in missing[text]:
                 embeddings[name] = embedding
+            
+            if self.config.cache_embeddings:
+                self.embeddings_cache[self._get_cache_key(text)] = embedding
+                if len(self.embeddings_cache) > self.config.cache_max_size:
+                    self.embeddings_cache.popitem(last=False)
+        
+        self._save_cache()
         
         return embeddings
     
+    def _get_doc_index(self, documents: Dict[str, str]) -> DocIndex:
+        """
+        Get the normalized embedding matrix for documents, reusing the
+        previous one if the document set is unchanged.
+        
+        Args:
+            documents: Dictionary of {name: content}
+            
+        Returns:
+            DocIndex for the documents
+        """
+        # Tuple equality checks identity first, so a corpus passed in again
+        # compares cheaply; changed content is still compared in full
+        items = tuple(documents.items())
+        
+        if self._last_index is not None and self._last_index.documents == items:
+            return self._last_index
+        
+        doc_embeddings = self.embed_documents(documents)
+        names = list(doc_embeddings)
+        
+        if names:
+            matrix = np.vstack([doc_embeddings[name] for name in names]).astype(np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        
+        index = DocIndex(names=names, matrix=matrix, documents=items)
+        
+        # Documents that failed to embed are missing from the index; keep
+        # retrying them instead of reusing the partial result
+        if len(names) == len(documents):
+            self._last_index = index
+        return index
+    
     def find_similar(
         self,
         query: str,
@@ -165,34 +265,29 @@ class EmbeddingManager:
         if query_embedding is None:
             return self._keyword_fallback(query, documents, top_k)
         
-        # Embed documents
-        doc_embeddings = self.embed_documents(documents)
-        
-        # Calculate similarities
-        similarities = []
-        for name, doc_embedding in doc_embeddings.items():
-            similarity = self._cosine_similarity(query_embedding, doc_embedding)
-            
-            # Filter by threshold
-            if similarity >= self.config.similarity_threshold:
-                similarities.append((name, float(similarity)))
+        query_norm = np.linalg.norm(query_embedding)
+        if query_norm == 0:
+            return []
         
-        # Sort by similarity (descending)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        # Embed documents (cached across calls for the same corpus)
+        index = self._get_doc_index(documents)
+        if not index.names:
+            return []
         
-        # Return top k
-        return similarities[:top_k]
-    
-    def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
-        """Calculate cosine similarity between two vectors."""
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
+        # Cosine similarity of every document in one matrix-vector product
+        similarities = index.matrix @ (query_embedding / query_norm).astype(np.float32)
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+        # Partial top-k selection, then order just those k
+        k = min(top_k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
         
-        return dot_product / (norm1 * norm2)
+        threshold = self.config.similarity_threshold
+        return [
+            (index.names[i], float(similarities[i]))
+            for i in top
+            if similarities[i] >= threshold
+        ]
     
     def _keyword_fallback(
         self,
@@ -214,12 +309,11 @@ class EmbeddingManager:
         top_k = top_k or self.config.max_results
         
         query_lower = query.lower()
-        query_words = set(query_lower.split())
+        query_words = frozenset(_WORD_RE.findall(query_lower))
         
         scores = []
         for name, content in documents.items():
-            content_lower = content.lower()
-            content_words = set(content_lower.split())
+            content_lower, content_words = self._get_doc_tokens(content)
             
             # Calculate word overlap
             overlap = len(query_words & content_words)
@@ -237,14 +331,27 @@ class EmbeddingManager:
             max_score = max(s[1] for s in scores)
             scores = [(name, score / max_score) for name, score in scores]
         
-        # Sort and return top k
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:top_k]
+        # Return top k
+        return heapq.nlargest(top_k, scores, key=lambda x: x[1])
+    
+    def _get_doc_tokens(self, content: str) -> Tuple[str, FrozenSet[str]]:
+        """Get lowercased content and its word set, computing them once per document."""
+        tokens = self._doc_tokens.get(content)
+        
+        if tokens is None:
+            if len(self._doc_tokens) >= self.config.cache_max_size:
+                self._doc_tokens.clear()
+            
+            content_lower = content.lower()
+            tokens = (content_lower, frozenset(_WORD_RE.findall(content_lower)))
+            self._doc_tokens[content] = tokens
+        
+        return tokens
     
     def clear_cache(self):
         """Clear embeddings cache."""
-        self.embeddings_cache = {}
-        cache_file = self.cache_dir / "embeddings.pkl"
+        self.embeddings_cache = OrderedDict()
+        cache_file = self.cache_dir / "embeddings.npz"
         if cache_file.exists():
             cache_file.unlink()
         logger.info("Embedding cache cleared")
@@ -4,13 +4,28 @@ Error handling and recovery mechanisms for Qoder orchestration.
 Includes retry strategies, rollback management, and error classification.
 """
 
+import os
 import time
+import random
+import shutil
+import tempfile
+import threading
+import asyncio
+import functools
+import inspect
 import subprocess
 from pathlib import Path
-from typing import Optional, Callable, Any, List
+from typing import TYPE_CHECKING, Optional, Callable, Any, Deque, Dict, List, Sequence, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 import logging
-import git
+
+# gitpython is imported by RollbackManager._init_repo, so importing this
+# module for the task errors or RetryStrategy doesn't load it
+if TYPE_CHECKING:
+    import git
 
 logger = logging.getLogger(__name__)
 
@@ -46,9 +61,42 @@ class DependencyError(TaskError):
         super().__init__(message, recoverable=False)
 
 
+# Retry labels by exception class, matched along the exception's MRO
+_ERROR_LABELS = {
+    TimeoutError: "timeout",
+    NetworkError: "network",
+    subprocess.TimeoutExpired: "timeout",
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _label_for_error_type(error_type: type) -> Optional[str]:
+    """Get the retry label for an exception class, or None if unlabelled."""
+    for cls in error_type.__mro__:
+        label = _ERROR_LABELS.get(cls)
+        if label is not None:
+            return label
+    return None
+
+
+def _accepts_deadline(func: Callable) -> bool:
+    """Check whether func takes a ``deadline`` keyword argument."""
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+    param = params.get("deadline")
+    return param is not None and param.kind in (
+        inspect.Parameter.POSITIONAL_OR_KEYWORD,
+        inspect.Parameter.KEYWORD_ONLY,
+    )
+
+
 @dataclass
 class RetryAttempt:
     """Record of a retry attempt."""
+    __slots__ = ("attempt_number", "error", "backoff_seconds", "timestamp")
+    
     attempt_number: int
     error: Exception
     backoff_seconds: float
@@ -69,7 +117,30 @@ class RetryStrategy:
         self.backoff_factor = config.backoff_factor
         self.max_backoff = config.max_backoff
         self.retry_on_errors = config.retry_on_errors
-        self.attempts: List[RetryAttempt] = []
+        
+        # Entries may be exception classes (matched with isinstance) or
+        # legacy labels from _classify_error
+        self._retry_error_types = tuple(
+            e for e in self.retry_on_errors if isinstance(e, type)
+        )
+        self._retry_error_labels = frozenset(
+            e for e in self.retry_on_errors if isinstance(e, str)
+        )
+        self.jitter = getattr(config, "jitter", True)
+        
+        # Capped exponential delay per attempt, indexed by attempt - 1
+        self._backoff_table = tuple(
+            min(self.backoff_factor ** i, self.max_backoff)
+            for i in range(self.max_attempts)
+        )
+        
+        # Most recent attempts only, so long-running orchestrators stay bounded
+        self.attempts: Deque[RetryAttempt] = deque(
+            maxlen=getattr(config, "attempt_history_size", 1024)
+        )
+        
+        # Per-instance generator so tests can seed it
+        self._random = random.Random()
     
     def should_retry(self, error: Exception, attempt: int) -> bool:
         """
@@ -82,64 +153,136 @@ class RetryStrategy:
         Returns:
             True if should retry, False otherwise
         """
+        # Fast-fail checks come first: classification may stringify the
+        # error, which is costly for subprocess errors carrying large output
         if attempt >= self.max_attempts:
-            logger.info(f"Max retry attempts ({self.max_attempts}) reached")
+            logger.info("Max retry attempts (%d) reached", self.max_attempts)
             return False
         
         # Check if error is recoverable
         if isinstance(error, TaskError) and not error.recoverable:
-            logger.info(f"Error is not recoverable: {error}")
+            # Lazy formatting: str(error) is only built if INFO is enabled
+            logger.info("Error is not recoverable: %s", error)
             return False
         
-        # Check error type
-        error_type = self._classify_error(error)
-        if error_type not in self.retry_on_errors:
-            logger.info(f"Error type '{error_type}' not in retry list")
-            return False
+        # Check error type; class entries need no classification
+        if self._retry_error_types and isinstance(error, self._retry_error_types):
+            return True
+        
+        if self._retry_error_labels:
+            error_type = self._classify_error(error)
+            if error_type in self._retry_error_labels:
+                return True
+        else:
+            error_type = type(error).__name__
         
-        return True
+        logger.info("Error type '%s' not in retry list", error_type)
+        return False
     
     def _classify_error(self, error: Exception) -> str:
         """Classify error type."""
-        if isinstance(error, TimeoutError):
-            return "timeout"
-        elif isinstance(error, NetworkError):
-            return "network"
-        elif isinstance(error, subprocess.TimeoutExpired):
-            return "timeout"
-        elif "connection" in str(error).lower():
+        label = _label_for_error_type(type(error))
+        if label is not None:
+            return label
+        
+        # Only unknown exception types pay for message inspection
+        if "connection" in str(error).lower():
             return "network"
-        else:
-            return "temporary"
+        return "temporary"
     
     def calculate_backoff(self, attempt: int) -> float:
         """
         Calculate backoff time for retry attempt.
         
+        With jitter enabled the delay is drawn uniformly from
+        [0, exponential delay] so concurrent failures don't retry in lockstep.
+        
         Args:
             attempt: Current attempt number (1-indexed)
             
         Returns:
             Backoff time in seconds
         """
-        backoff = min(
-            self.backoff_factor ** (attempt - 1),
-            self.max_backoff
-        )
+        backoff = self._backoff_table[min(attempt, self.max_attempts) - 1]
+        
+        if self.jitter:
+            return self._random.uniform(0, backoff)
+        
         return backoff
     
+    def _prepare_retry(
+        self,
+        error: Exception,
+        attempt: int,
+        deadline_at: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Record a failed attempt and decide on the backoff before the next one.
+        
+        Args:
+            error: The exception that occurred
+            attempt: Current attempt number (1-indexed)
+            deadline_at: time.monotonic() value after which no retry starts
+            
+        Returns:
+            Backoff time in seconds, or None if we should not retry
+        """
+        logger.warning("Attempt %d failed: %s", attempt, error)
+        
+        if not self.should_retry(error, attempt):
+            return None
+        
+        backoff = self.calculate_backoff(attempt)
+        
+        if deadline_at is not None:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                logger.error("Retry deadline exceeded after %d attempts", attempt)
+                return None
+            backoff = min(backoff, remaining)
+        
+        # Record attempt
+        self.attempts.append(RetryAttempt(
+            attempt_number=attempt,
+            error=error,
+            backoff_seconds=backoff,
+            timestamp=time.time()
+        ))
+        
+        logger.info("Retrying in %.1f seconds...", backoff)
+        return backoff
+    
+    @staticmethod
+    def _start_deadline(
+        func: Callable,
+        overall_deadline: Optional[float],
+        kwargs: Dict[str, Any]
+    ) -> Tuple[Optional[float], bool]:
+        """Resolve the absolute deadline and whether func should receive it."""
+        if overall_deadline is None:
+            return None, False
+        deadline_at = time.monotonic() + overall_deadline
+        return deadline_at, "deadline" not in kwargs and _accepts_deadline(func)
+    
     def execute_with_retry(
         self,
         func: Callable,
         *args,
+        overall_deadline: Optional[float] = None,
         **kwargs
     ) -> Any:
         """
         Execute function with retry logic.
         
+        Backoff blocks the calling thread; from a coroutine use
+        execute_with_retry_async instead.
+        
         Args:
             func: Function to execute
             *args: Positional arguments for func
+            overall_deadline: Optional wall-clock budget in seconds for all
+                attempts and backoff. When func takes a ``deadline`` keyword,
+                it receives the seconds remaining on each attempt.
             **kwargs: Keyword arguments for func
             
         Returns:
@@ -149,45 +292,102 @@ class RetryStrategy:
             Last exception if all retries fail
         """
         last_error = None
+        deadline_at, pass_deadline = self._start_deadline(func, overall_deadline, kwargs)
         
         for attempt in range(1, self.max_attempts + 1):
             try:
-                logger.info(f"Attempt {attempt}/{self.max_attempts}")
+                logger.info("Attempt %d/%d", attempt, self.max_attempts)
+                if pass_deadline:
+                    kwargs["deadline"] = max(0.0, deadline_at - time.monotonic())
                 result = func(*args, **kwargs)
                 
                 if attempt > 1:
-                    logger.info(f"✓ Succeeded on attempt {attempt}")
+                    logger.info("✓ Succeeded on attempt %d", attempt)
                 
                 return result
                 
             except Exception as e:
                 last_error = e
-                logger.warning(f"Attempt {attempt} failed: {e}")
                 
-                if not self.should_retry(e, attempt):
+                backoff = self._prepare_retry(e, attempt, deadline_at)
+                if backoff is None:
                     raise
                 
-                backoff = self.calculate_backoff(attempt)
+                time.sleep(backoff)
+        
+        # All retries failed
+        logger.error("All %d attempts failed", self.max_attempts)
+        raise last_error
+    
+    async def execute_with_retry_async(
+        self,
+        func: Callable,
+        *args,
+        overall_deadline: Optional[float] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Execute function with retry logic without blocking the event loop.
+        
+        Coroutine functions are awaited directly; plain callables run in the
+        loop's default executor.
+        
+        Args:
+            func: Function or coroutine function to execute
+            *args: Positional arguments for func
+            overall_deadline: Optional wall-clock budget in seconds for all
+                attempts and backoff. When func takes a ``deadline`` keyword,
+                it receives the seconds remaining on each attempt.
+            **kwargs: Keyword arguments for func
+            
+        Returns:
+            Result of func
+            
+        Raises:
+            Last exception if all retries fail
+        """
+        loop = asyncio.get_running_loop()
+        last_error = None
+        deadline_at, pass_deadline = self._start_deadline(func, overall_deadline, kwargs)
+        
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                logger.info("Attempt %d/%d", attempt, self.max_attempts)
+                if pass_deadline:
+                    kwargs["deadline"] = max(0.0, deadline_at - time.monotonic())
                 
-                # Record attempt
-                self.attempts.append(RetryAttempt(
-                    attempt_number=attempt,
-                    error=e,
-                    backoff_seconds=backoff,
-                    timestamp=time.time()
-                ))
+                if asyncio.iscoroutinefunction(func):
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await loop.run_in_executor(
+                        None, functools.partial(func, *args, **kwargs)
+                    )
                 
-                logger.info(f"Retrying in {backoff:.1f} seconds...")
-                time.sleep(backoff)
+                if attempt > 1:
+                    logger.info("✓ Succeeded on attempt %d", attempt)
+                
+                return result
+                
+            except Exception as e:
+                last_error = e
+                
+                backoff = self._prepare_retry(e, attempt, deadline_at)
+                if backoff is None:
+                    raise
+                
+                await asyncio.sleep(backoff)
         
         # All retries failed
-        logger.error(f"All {self.max_attempts} attempts failed")
+        logger.error("All %d attempts failed", self.max_attempts)
         raise last_error
 
 
 class RollbackManager:
     """Manages git-based checkpoints and rollbacks."""
     
+    # Checkpoints are lightweight refs kept out of refs/tags
+    CHECKPOINT_REF_PREFIX = "refs/qoder-checkpoints/"
+    
     def __init__(self, project_dir: Path, config: Any):
         """
         Initialize rollback manager.
@@ -201,21 +401,79 @@ class RollbackManager:
         self.create_checkpoints = config.create_checkpoints
         self.keep_checkpoints = config.keep_checkpoints
         self.auto_rollback = config.auto_rollback_on_failure
+        self.max_files_for_checkpoint = getattr(config, "max_files_for_checkpoint", 50000)
+        
+        self.repo: Optional["git.Repo"] = None
+        # Raw 20-byte digests; the public API takes and returns hex
+        self.checkpoints: List[bytes] = []
+        self.checkpoint_refs: List[str] = []  # Parallel to checkpoints
+        
+        # Tree snapshot of uncommitted work per checkpoint (None if clean)
+        self.checkpoint_trees: List[Optional[str]] = []
         
-        self.repo: Optional[git.Repo] = None
-        self.checkpoints: List[str] = []
+        # Checkpoint ref each task's checkpoint lives under; a task that
+        # reused the previous checkpoint maps to that task's ref
+        self._task_refs: Dict[str, str] = {}
+        
+        # (HEAD, snapshot tree) of the newest checkpoint, so an unchanged
+        # repository can reuse it instead of writing another ref
+        self._last_state: Optional[Tuple[str, Optional[str]]] = None
+        
+        # Dedicated worker for the async API so slow git calls don't occupy
+        # the loop's default executor; one worker keeps git operations on
+        # the repository serialized
+        self._pool: Optional[ThreadPoolExecutor] = None
+        
+        # Long-lived git helpers, started on first use (see _git_helper)
+        self._catfile: Optional[subprocess.Popen] = None
+        self._updref: Optional[subprocess.Popen] = None
+        self._helper_lock = threading.Lock()
         
         if self.enabled:
             self._init_repo()
     
     def _init_repo(self):
         """Initialize git repository."""
+        import git
+        
         try:
             self.repo = git.Repo(self.project_dir)
             logger.info("Git repository initialized for rollback")
         except git.InvalidGitRepositoryError:
             logger.warning("Not a git repository - rollback disabled")
             self.enabled = False
+            return
+        
+        # Checkpoints cost seconds each on huge workspaces; skip them there
+        if self.create_checkpoints:
+            file_count = self.repo.git.ls_files("-z").count("\0")
+            if file_count > self.max_files_for_checkpoint:
+                logger.warning(
+                    "Workspace has %d tracked files (> %d) - checkpoints disabled",
+                    file_count, self.max_files_for_checkpoint
+                )
+                self.create_checkpoints = False
+        
+        # Adopt checkpoints left by earlier runs so they are pruned and
+        # available for rollback like our own
+        for sha, ref_name in self._list_checkpoint_refs():
+            self.checkpoints.append(_to_bin(sha))
+            self.checkpoint_refs.append(ref_name)
+            self.checkpoint_trees.append(None)
+    
+    def _list_checkpoint_refs(self) -> List[Tuple[str, str]]:
+        """
+        List checkpoint refs with one `git for-each-ref` over our namespace.
+        
+        Returns:
+            List of (sha, ref name) tuples, oldest commit first
+        """
+        output = self.repo.git.for_each_ref(
+            "--sort=committerdate",
+            "--format=%(objectname) %(refname)",
+            self.CHECKPOINT_REF_PREFIX
+        )
+        return [tuple(line.split(" ", 1)) for line in output.splitlines()]
     
     def create_checkpoint(self, task_id: str, description: str) -> Optional[str]:
         """
@@ -232,40 +490,74 @@ class RollbackManager:
             return None
         
         try:
-            # Create a tag for the checkpoint
-            tag_name = f"qoder-checkpoint-{task_id}"
-            
-            # Check if there are changes to commit
-            if self.repo.is_dirty(untracked_files=True):
-                # Stash changes
-                logger.info("Stashing uncommitted changes")
-                self.repo.git.stash("save", f"Qoder checkpoint: {description}")
-            
-            # Create tag at current HEAD
-            tag = self.repo.create_tag(
-                tag_name,
-                message=f"Checkpoint before task {task_id}: {description}"
-            )
+            ref_name = f"{self.CHECKPOINT_REF_PREFIX}{task_id}"
+            
+            # Snapshot uncommitted changes without touching the working tree
+            snapshot_tree = None
+            if self._is_dirty_fast():
+                logger.info("Snapshotting uncommitted changes")
+                snapshot_tree = self._snapshot_worktree()
             
-            checkpoint_sha = str(tag.commit)
-            self.checkpoints.append(checkpoint_sha)
+            checkpoint_sha = self.repo.head.commit.hexsha
+            state = (checkpoint_sha, snapshot_tree)
+            if state == self._last_state and self.checkpoints:
+                logger.info("Nothing changed since last checkpoint; reusing %.8s for %s",
+                            checkpoint_sha, task_id)
+                self._task_refs[task_id] = self.checkpoint_refs[-1]
+                return checkpoint_sha
+            
+            # Point a lightweight ref at current HEAD (no tag object written)
+            self._update_refs(f"update {ref_name} {checkpoint_sha}\n")
+            
+            # A re-checkpointed task moves its ref; drop the stale entry
+            if ref_name in self.checkpoint_refs:
+                index = self.checkpoint_refs.index(ref_name)
+                del self.checkpoint_refs[index]
+                del self.checkpoints[index]
+                del self.checkpoint_trees[index]
+            
+            self.checkpoints.append(_to_bin(checkpoint_sha))
+            self.checkpoint_refs.append(ref_name)
+            self.checkpoint_trees.append(snapshot_tree)
+            self._task_refs[task_id] = ref_name
+            self._last_state = state
             
             # Clean up old checkpoints
             self._cleanup_old_checkpoints()
             
-            logger.info(f"Created checkpoint: {tag_name} ({checkpoint_sha[:8]})")
+            logger.info("Created checkpoint: %s (%.8s) - %s", ref_name, checkpoint_sha, description)
             return checkpoint_sha
             
         except Exception as e:
-            logger.error(f"Failed to create checkpoint: {e}")
+            logger.error("Failed to create checkpoint: %s", e)
             return None
     
-    def rollback_to_checkpoint(self, checkpoint_sha: str) -> bool:
+    def _is_dirty_fast(self, exclude: Sequence[str] = ()) -> bool:
+        """
+        Check for uncommitted or untracked changes with a single `git status`.
+        
+        Args:
+            exclude: Pathspec patterns to skip (e.g. heavy build directories)
+            
+        Returns:
+            True if the working tree has changes
+        """
+        args = ["--porcelain", "-z", "--untracked-files=normal"]
+        if exclude:
+            args.append("--")
+            args.append(".")
+            args.extend(f":!{pattern}" for pattern in exclude)
+        
+        return bool(self.repo.git.status(*args))
+    
+    def rollback_to_checkpoint(self, checkpoint_sha: str, task_id: Optional[str] = None) -> bool:
         """
         Rollback to a specific checkpoint.
         
         Args:
             checkpoint_sha: Checkpoint commit SHA
+            task_id: Task the checkpoint was created for; without it only
+                the commit is restored, not the snapshot of uncommitted work
             
         Returns:
             True if successful, False otherwise
@@ -274,54 +566,314 @@ class RollbackManager:
             logger.warning("Rollback disabled")
             return False
         
+        # Whatever happens below, the tree may no longer match the last checkpoint
+        self._last_state = None
+        
         try:
-            logger.warning(f"Rolling back to checkpoint {checkpoint_sha[:8]}")
+            logger.warning("Rolling back to checkpoint %.8s", checkpoint_sha)
             
-            # Reset to checkpoint
-            self.repo.git.reset("--hard", checkpoint_sha)
+            if not self._commit_exists(checkpoint_sha):
+                logger.error("Checkpoint %.8s does not exist", checkpoint_sha)
+                return False
             
-            # Try to pop stash if exists
-            try:
-                self.repo.git.stash("pop")
-            except git.GitCommandError:
-                pass  # No stash to pop
+            # Restore only the paths that differ, then move the branch back
+            self._restore_changed_paths(checkpoint_sha)
+            if self.repo.head.commit.hexsha != checkpoint_sha:
+                self.repo.git.update_ref(
+                    "-m", f"qoder: rollback to {checkpoint_sha[:8]}",
+                    "HEAD", checkpoint_sha
+                )
+            
+            # Bring back uncommitted work captured with the checkpoint
+            snapshot_tree = self._find_snapshot_tree(checkpoint_sha, task_id)
+            if snapshot_tree:
+                self._restore_snapshot(checkpoint_sha, snapshot_tree)
             
             logger.info("✓ Rollback successful")
             return True
             
         except Exception as e:
-            logger.error(f"Rollback failed: {e}")
+            logger.error("Rollback failed: %s", e)
             return False
     
+    async def create_checkpoint_async(self, task_id: str, description: str) -> Optional[str]:
+        """Async variant of create_checkpoint that runs git off the event loop."""
+        return await self._run_in_pool(self.create_checkpoint, task_id, description)
+    
+    async def rollback_to_checkpoint_async(
+        self,
+        checkpoint_sha: str,
+        task_id: Optional[str] = None
+    ) -> bool:
+        """Async variant of rollback_to_checkpoint that runs git off the event loop."""
+        return await self._run_in_pool(self.rollback_to_checkpoint, checkpoint_sha, task_id)
+    
+    async def _run_in_pool(self, func: Callable, *args) -> Any:
+        """Run a blocking method on the manager's git worker thread."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qoder-git")
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(func, *args))
+    
+    def close(self):
+        """Shut down the async worker thread and git helper processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        
+        with self._helper_lock:
+            for proc in (self._catfile, self._updref):
+                if proc is not None:
+                    self._stop_helper(proc)
+            self._catfile = None
+            self._updref = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
     def rollback_last_checkpoint(self) -> bool:
         """Rollback to the most recent checkpoint."""
         if not self.checkpoints:
             logger.warning("No checkpoints available for rollback")
             return False
         
-        return self.rollback_to_checkpoint(self.checkpoints[-1])
+        task_id = self.checkpoint_refs[-1][len(self.CHECKPOINT_REF_PREFIX):]
+        return self.rollback_to_checkpoint(_to_hex(self.checkpoints[-1]), task_id)
     
     def _cleanup_old_checkpoints(self):
         """Remove old checkpoints beyond the keep limit."""
         if len(self.checkpoints) <= self.keep_checkpoints:
             return
         
-        # Remove oldest checkpoints
-        to_remove = self.checkpoints[:-self.keep_checkpoints]
+        # Remove oldest checkpoints in a single ref transaction
+        excess = len(self.checkpoints) - self.keep_checkpoints
+        stale_refs = self.checkpoint_refs[:excess]
         
-        for checkpoint_sha in to_remove:
-            try:
-                # Find and delete tag
-                for tag in self.repo.tags:
-                    if str(tag.commit) == checkpoint_sha:
-                        self.repo.delete_tag(tag)
-                        logger.debug(f"Removed old checkpoint tag: {tag.name}")
-                        break
-            except Exception as e:
-                logger.warning(f"Failed to remove old checkpoint: {e}")
+        try:
+            self._update_refs("".join(f"delete {ref}\n" for ref in stale_refs))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Removed old checkpoint refs: %s", ", ".join(stale_refs))
+        except Exception as e:
+            logger.warning("Failed to remove old checkpoints: %s", e)
         
         # Update checkpoint list
-        self.checkpoints = self.checkpoints[-self.keep_checkpoints:]
+        self.checkpoints = self.checkpoints[excess:]
+        self.checkpoint_refs = self.checkpoint_refs[excess:]
+        self.checkpoint_trees = self.checkpoint_trees[excess:]
+        
+        stale = set(stale_refs)
+        self._task_refs = {
+            task: ref for task, ref in self._task_refs.items() if ref not in stale
+        }
+    
+    def _restore_changed_paths(self, checkpoint_sha: str):
+        """
+        Make index and working tree match a checkpoint, touching only the
+        tracked paths that differ from it. Untracked files are left alone.
+        
+        Args:
+            checkpoint_sha: Checkpoint commit SHA
+        """
+        changed = {}
+        for diff_args in (("-z", checkpoint_sha), ("--cached", "-z", checkpoint_sha)):
+            fields = self.repo.git.diff("--name-status", "--no-renames", *diff_args).split("\0")
+            for status, path in zip(fields[0::2], fields[1::2]):
+                # A worktree/index deletion must not hide a staged addition
+                if changed.get(path) != "A":
+                    changed[path] = status
+        
+        restore = [path for path, status in changed.items() if status != "A"]
+        remove = [path for path, status in changed.items() if status == "A"]
+        
+        # Paths go through stdin so large diffs can't overflow ARG_MAX;
+        # --literal-pathspecs keeps names like "a*" from matching as globs
+        if restore:
+            self._run_git(
+                "--literal-pathspecs", "checkout", checkpoint_sha,
+                "--pathspec-from-file=-", "--pathspec-file-nul",
+                input="\0".join(restore)
+            )
+        if remove:
+            self._run_git(
+                "--literal-pathspecs", "rm", "-q", "-f", "--ignore-unmatch",
+                "--pathspec-from-file=-", "--pathspec-file-nul",
+                input="\0".join(remove)
+            )
+    
+    def _snapshot_worktree(self) -> str:
+        """
+        Write the working tree, including untracked files, as a tree object.
+        
+        Uses a copy of the index so the user's staging area is untouched and
+        only modified files need rehashing.
+        
+        Returns:
+            Tree SHA
+        """
+        with tempfile.TemporaryDirectory(prefix="qoder-index-") as tmp:
+            env = {"GIT_INDEX_FILE": os.path.join(tmp, "index")}
+            index_file = os.path.join(self.repo.git_dir, "index")
+            if os.path.exists(index_file):
+                shutil.copyfile(index_file, env["GIT_INDEX_FILE"])
+            
+            self._run_git("add", "-A", env=env)
+            return self._run_git("write-tree", env=env).strip()
+    
+    def _find_snapshot_tree(self, checkpoint_sha: str, task_id: Optional[str]) -> Optional[str]:
+        """
+        Get the snapshot tree recorded with a task's checkpoint.
+        
+        Several checkpoints can share a commit, so the tree is looked up by
+        the task's checkpoint ref rather than by SHA.
+        
+        Args:
+            checkpoint_sha: Checkpoint commit SHA
+            task_id: Task the checkpoint was created for
+            
+        Returns:
+            Tree SHA, or None if the checkpoint had no snapshot or is unknown
+        """
+        ref_name = self._task_refs.get(task_id) if task_id is not None else None
+        if ref_name is None or ref_name not in self.checkpoint_refs:
+            return None
+        
+        index = self.checkpoint_refs.index(ref_name)
+        try:
+            if self.checkpoints[index] != _to_bin(checkpoint_sha):
+                return None  # The ref has since moved to another commit
+        except ValueError:
+            return None  # Not a full SHA, so not one we recorded
+        return self.checkpoint_trees[index]
+    
+    def _restore_snapshot(self, checkpoint_sha: str, snapshot_tree: str):
+        """
+        Write snapshotted uncommitted changes back into the working tree.
+        
+        Only paths where the snapshot differs from the checkpoint commit are
+        touched; the index is left at the checkpoint commit.
+        
+        Args:
+            checkpoint_sha: Checkpoint commit SHA
+            snapshot_tree: Tree SHA from _snapshot_worktree
+        """
+        fields = self._run_git(
+            "diff-tree", "-r", "--name-status", "--no-renames", "-z",
+            checkpoint_sha, snapshot_tree
+        ).split("\0")
+        
+        write = []
+        for status, path in zip(fields[0::2], fields[1::2]):
+            if status == "D":
+                # Deleted in the snapshot: remove from the working tree only
+                try:
+                    os.unlink(os.path.join(self.repo.working_dir, path))
+                except FileNotFoundError:
+                    pass
+            else:
+                write.append(path)
+        
+        if not write:
+            return
+        
+        with tempfile.TemporaryDirectory(prefix="qoder-index-") as tmp:
+            env = {"GIT_INDEX_FILE": os.path.join(tmp, "index")}
+            self._run_git("read-tree", snapshot_tree, env=env)
+            self._run_git(
+                "checkout-index", "-f", "-z", "--stdin",
+                input="\0".join(write), env=env
+            )
+    
+    def _git_helper(self, *args: str) -> subprocess.Popen:
+        """Start a long-lived git process that talks over stdin/stdout."""
+        return subprocess.Popen(
+            ["git", *args],
+            cwd=self.repo.working_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+    
+    @staticmethod
+    def _stop_helper(proc: subprocess.Popen):
+        """Close a helper's stdin and wait for it to exit."""
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+    
+    def _commit_exists(self, sha: str) -> bool:
+        """Check that a SHA names a commit via the persistent `cat-file --batch-check`."""
+        with self._helper_lock:
+            if self._catfile is None or self._catfile.poll() is not None:
+                self._catfile = self._git_helper(
+                    "cat-file", "--batch-check=%(objectname) %(objecttype)"
+                )
+            
+            self._catfile.stdin.write(f"{sha}\n")
+            self._catfile.stdin.flush()
+            reply = self._catfile.stdout.readline().split()
+        
+        return len(reply) == 2 and reply[1] == "commit"
+    
+    def _update_refs(self, commands: str):
+        """
+        Apply ref updates as one transaction on the persistent
+        `git update-ref --stdin` process.
+        
+        Args:
+            commands: Newline-terminated update-ref commands
+            
+        Raises:
+            RuntimeError: If git rejects the transaction
+        """
+        with self._helper_lock:
+            if self._updref is None or self._updref.poll() is not None:
+                self._updref = self._git_helper("update-ref", "--stdin")
+            
+            proc = self._updref
+            proc.stdin.write(f"start\n{commands}commit\n")
+            proc.stdin.flush()
+            
+            for expected in ("start: ok", "commit: ok"):
+                reply = proc.stdout.readline().strip()
+                if reply != expected:
+                    # git exits on a failed transaction; respawn next time
+                    self._stop_helper(proc)
+                    self._updref = None
+                    raise RuntimeError(
+                        f"git update-ref failed: {proc.stderr.read().strip() or reply}"
+                    )
+    
+    def _run_git(
+        self,
+        *args: str,
+        input: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Run a git command in the repository, feeding `input` on stdin."""
+        result = subprocess.run(
+            ["git", *args],
+            cwd=self.repo.working_dir,
+            input=input,
+            env={**os.environ, **env} if env else None,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout
     
     def get_checkpoint_info(self, checkpoint_sha: str) -> Optional[dict]:
         """Get information about a checkpoint."""
@@ -337,8 +889,90 @@ class RollbackManager:
                 "timestamp": commit.committed_datetime.isoformat(),
             }
         except Exception as e:
-            logger.error(f"Failed to get checkpoint info: {e}")
+            logger.error("Failed to get checkpoint info: %s", e)
             return None
+    
+    def get_checkpoint_infos(self, checkpoint_shas: Sequence[str]) -> Dict[str, dict]:
+        """
+        Get information about many checkpoints with one `git cat-file --batch`.
+        
+        Args:
+            checkpoint_shas: Checkpoint commit SHAs
+            
+        Returns:
+            Dictionary of {sha: info} in the same format as get_checkpoint_info;
+            SHAs that can't be resolved are omitted
+        """
+        infos: Dict[str, dict] = {}
+        if not self.enabled or not checkpoint_shas:
+            return infos
+        
+        try:
+            result = subprocess.run(
+                ["git", "cat-file", "--batch"],
+                cwd=self.repo.working_dir,
+                input="".join(f"{sha}\n" for sha in checkpoint_shas).encode(),
+                capture_output=True,
+                check=True
+            )
+        except Exception as e:
+            logger.error("Failed to get checkpoint info: %s", e)
+            return infos
+        
+        out = result.stdout
+        pos = 0
+        for sha in checkpoint_shas:
+            header_end = out.index(b"\n", pos)
+            header = out[pos:header_end].split()
+            pos = header_end + 1
+            
+            # "<sha> missing" / "<sha> ambiguous" have no body
+            if len(header) != 3:
+                continue
+            
+            size = int(header[2])
+            body = out[pos:pos + size].decode("utf-8", errors="replace")
+            pos += size + 1  # Contents are followed by a newline
+            
+            if header[1] == b"commit":
+                infos[sha] = _parse_commit_info(sha, body)
+        
+        return infos
+
+
+def _to_bin(sha: str) -> bytes:
+    """Pack a hex SHA into its raw digest bytes."""
+    return bytes.fromhex(sha)
+
+
+def _to_hex(sha: bytes) -> str:
+    """Format raw digest bytes as a hex SHA."""
+    return sha.hex()
+
+
+def _parse_commit_info(sha: str, raw: str) -> dict:
+    """Build checkpoint info from a raw commit object as printed by cat-file."""
+    headers, _, message = raw.partition("\n\n")
+    author = ""
+    timestamp = ""
+    
+    for line in headers.splitlines():
+        key, _, value = line.partition(" ")
+        if key == "author":
+            author = value.split(" <", 1)[0]
+        elif key == "committer":
+            # "Name <email> <epoch> <+hhmm>"
+            epoch, offset = value.rsplit(" ", 2)[1:]
+            sign = -1 if offset.startswith("-") else 1
+            tz = timezone(sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+            timestamp = datetime.fromtimestamp(int(epoch), tz).isoformat()
+    
+    return {
+        "sha": sha,
+        "message": message,
+        "author": author,
+        "timestamp": timestamp,
+    }
 
 
 class ErrorRecoveryManager:
@@ -388,11 +1022,52 @@ class ErrorRecoveryManager:
             return result
             
         except Exception as e:
-            logger.error(f"Task {task_id} failed after all recovery attempts: {e}")
+            logger.error("Task %s failed after all recovery attempts: %s", task_id, e)
+            
+            # Auto-rollback if configured
+            if self.rollback_manager.auto_rollback and checkpoint:
+                logger.warning("Auto-rollback enabled, reverting changes...")
+                self.rollback_manager.rollback_to_checkpoint(checkpoint, task_id)
+            
+            raise
+    
+    async def execute_task_with_recovery_async(
+        self,
+        task_id: str,
+        task_description: str,
+        task_func: Callable,
+        *args,
+        **kwargs
+    ) -> Any:
+        """
+        Execute task with full error recovery without blocking the event loop.
+        
+        Args:
+            task_id: Task identifier
+            task_description: Task description
+            task_func: Function or coroutine function to execute
+            *args: Positional arguments for task_func
+            **kwargs: Keyword arguments for task_func
+            
+        Returns:
+            Result of task_func
+            
+        Raises:
+            Exception if task fails after all recovery attempts
+        """
+        # Create checkpoint
+        checkpoint = await self.rollback_manager.create_checkpoint_async(task_id, task_description)
+        
+        try:
+            # Execute with retry
+            return await self.retry_strategy.execute_with_retry_async(task_func, *args, **kwargs)
+            
+        except Exception as e:
+            logger.error("Task %s failed after all recovery attempts: %s", task_id, e)
             
             # Auto-rollback if configured
             if self.rollback_manager.auto_rollback and checkpoint:
                 logger.warning("Auto-rollback enabled, reverting changes...")
-                self.rollback_manager.rollback_to_checkpoint(checkpoint)
+                await self.rollback_manager.rollback_to_checkpoint_async(checkpoint, task_id)
             
             raise
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+On-disk cache for LLM CLI responses.
+Stores successful responses content-addressed by a hash of the request.
+"""
+
+import os
+import json
+import atexit
+import weakref
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional, Any, Dict, List, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+# numpy is only needed by the semantic tier; importing it at module level
+# would add tens of milliseconds to every CLI start
+np = None
+
+
+def _load_numpy():
+    """Import numpy on first use."""
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+DEFAULT_LLM_CACHE_DIR = Path.home() / ".qoder_orchestrator" / "llm_cache"
+
+# Semantic index growth: first allocation, and the fewest unsaved rows
+# that trigger a rewrite of the index file
+_INITIAL_CAPACITY = 64
+_MIN_UNSAVED_ROWS = 16
+
+# Mode for cache entries; mkstemp would leave them 0600. The umask can only
+# be read by setting it, so that happens once at import
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+class LLMCache:
+    """Content-addressed cache of CLI responses, one JSON file per entry."""
+    
+    def __init__(self, cache_dir: Optional[Path] = None):
+        """
+        Initialize LLM response cache.
+        
+        Args:
+            cache_dir: Directory for cache entries
+                (default: ~/.qoder_orchestrator/llm_cache)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_LLM_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(provider: str, prompt: str, options: Dict[str, Any]) -> str:
+        """
+        Generate cache key for a request.
+        
+        Args:
+            provider: Client identifier (e.g. class name)
+            prompt: The prompt text
+            options: CLI options the response depends on
+        
+        Returns:
+            Hex SHA-256 of the request
+        """
+        key_str = f"{provider}|{json.dumps(options, sort_keys=True)}|{prompt}"
+        return hashlib.sha256(key_str.encode()).hexdigest()
+    
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+    
+    def get(self, key: str, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached response.
+        
+        Args:
+            key: Cache key from make_key
+            max_age_seconds: Treat older entries as missing (None: never expire)
+        
+        Returns:
+            Dict with 'content', 'raw_output' and 'timestamp', or None
+        """
+        entry = self._read(key, max_age_seconds)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        logger.debug(f"LLM cache hit: {key[:8]}")
+        return entry
+    
+    def _read(self, key: str, max_age_seconds: Optional[float]) -> Optional[Dict[str, Any]]:
+        """Read an entry, dropping it if unreadable or expired."""
+        path = self._entry_path(key)
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable LLM cache entry {key[:8]}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        
+        if max_age_seconds is not None and time.time() - entry.get("timestamp", 0) > max_age_seconds:
+            logger.debug(f"LLM cache entry expired: {key[:8]}")
+            path.unlink(missing_ok=True)
+            return None
+        
+        return entry
+    
+    def set(self, key: str, content: str, raw_output: str):
+        """
+        Store a response.
+        
+        Args:
+            key: Cache key from make_key
+            content: Parsed response content
+            raw_output: Raw CLI output
+        """
+        entry = {
+            "content": content,
+            "raw_output": raw_output,
+            "timestamp": time.time()
+        }
+        
+        # Write to a temp file and rename so readers never see partial JSON
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f)
+                os.chmod(tmp_path, _NEW_FILE_MODE)
+                os.replace(tmp_path, self._entry_path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Failed to write LLM cache entry: {e}")
+    
+    def clear(self):
+        """Remove all cache entries."""
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+        
+        self.hits = 0
+        self.misses = 0
+        self._clear_extra()
+        logger.info("LLM cache cleared")
+    
+    def _clear_extra(self):
+        """Hook for subclasses to drop state kept beside the entries."""
+        pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+class SemanticLLMCache(LLMCache):
+    """
+    LLM cache that can also serve responses to near-duplicate prompts.
+    
+    Prompts of responses requested with semantic_cache=True are embedded
+    and kept as an L2-normalized matrix next to the entry files; a lookup
+    is one matrix-vector product.
+    """
+    
+    INDEX_FILE = "semantic_index.npz"
+    
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        model_name: str = "all-MiniLM-L6-v2",
+        similarity_threshold: float = 0.97
+    ):
+        """
+        Initialize semantic LLM response cache.
+        
+        Args:
+            cache_dir: Directory for cache entries
+            model_name: Sentence-transformers model used to embed prompts
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+        """
+        _load_numpy()
+        super().__init__(cache_dir)
+        self.model_name = model_name
+        self.similarity_threshold = similarity_threshold
+        self.semantic_hits = 0
+        
+        # Loaded on first use; the exact tier works without the model
+        self.model = None
+        self._model_failed = False
+        
+        # Row i of _matrix embeds the prompt of entry _keys[i]; _scopes[i]
+        # hashes the client and options, which must match exactly. The
+        # matrix has spare rows past len(_keys) so inserts don't copy it
+        self._keys: List[str] = []
+        self._scopes: List[str] = []
+        self._key_set: Set[str] = set()
+        self._matrix: Optional["np.ndarray"] = None
+        self._unsaved_rows = 0
+        self._load_index()
+        _live_caches.add(self)
+    
+    def _load_model(self) -> bool:
+        """Load the embedding model, returning False if unavailable."""
+        if self.model is not None:
+            return True
+        if self._model_failed:
+            return False
+        
+        try:
+            from sentence_transformers import SentenceTransformer
+            
+            logger.info(f"Loading prompt embedding model: {self.model_name}")
+            self.model = SentenceTransformer(self.model_name)
+            return True
+            
+        except ImportError:
+            logger.error("sentence-transformers not installed; semantic LLM cache disabled")
+        except Exception as e:
+            logger.error(f"Failed to load prompt embedding model: {e}")
+        
+        self._model_failed = True
+        return False
+    
+    def _embed(self, prompt: str) -> Optional["np.ndarray"]:
+        """Embed a prompt as a normalized float32 vector."""
+        if not self._load_model():
+            return None
+        
+        vector = np.asarray(self.model.encode(prompt, convert_to_numpy=True), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    @staticmethod
+    def _scope(provider: str, options: Dict[str, Any]) -> str:
+        """Hash the parts of a request that must match exactly."""
+        return LLMCache.make_key(provider, "", options)
+    
+    def get_similar(
+        self,
+        provider: str,
+        prompt: str,
+        options: Dict[str, Any],
+        max_age_seconds: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached response of the most similar earlier prompt.
+        
+        Args:
+            provider: Client identifier (e.g. class name)
+            prompt: The prompt text
+            options: CLI options the response depends on
+            max_age_seconds: Treat older entries as missing (None: never expire)
+            
+        Returns:
+            Cached entry dict, or None if no prompt is similar enough
+        """
+        if self._matrix is None or not self._keys:
+            return None
+        
+        query = self._embed(prompt)
+        if query is None:
+            return None
+        
+        scope = self._scope(provider, options)
+        similarities = self._matrix[:len(self._keys)] @ query
+        
+        # Best match first among entries with the same client and options
+        for row in np.argsort(similarities)[::-1]:
+            if similarities[row] < self.similarity_threshold:
+                break
+            if self._scopes[row] != scope:
+                continue
+            
+            entry = self._read(self._keys[row], max_age_seconds)
+            if entry is not None:
+                self.semantic_hits += 1
+                logger.debug(f"Semantic LLM cache hit: {self._keys[row][:8]} "
+                             f"(similarity {similarities[row]:.3f})")
+                return entry
+        
+        return None
+    
+    def index_prompt(self, key: str, provider: str, prompt: str, options: Dict[str, Any]):
+        """
+        Make a stored response findable by similar prompts.
+        
+        Args:
+            key: Cache key the response was stored under
+            provider: Client identifier (e.g. class name)
+            prompt: The prompt text
+            options: CLI options the response depends on
+        """
+        if key in self._key_set:
+            return
+        
+        vector = self._embed(prompt)
+        if vector is None:
+            return
+        
+        rows = len(self._keys)
+        if self._matrix is None or rows == len(self._matrix):
+            self._grow_matrix(rows, len(vector))
+        self._matrix[rows] = vector
+        self._keys.append(key)
+        self._scopes.append(self._scope(provider, options))
+        self._key_set.add(key)
+        
+        # Rewrite the index once unsaved rows reach a quarter of it, so
+        # saving costs amortized O(1) per insert; flush() writes the rest
+        self._unsaved_rows += 1
+        if self._unsaved_rows >= max(_MIN_UNSAVED_ROWS, rows // 4):
+            self._save_index()
+    
+    def _grow_matrix(self, rows: int, dim: int):
+        """Double the matrix capacity, keeping the first rows rows."""
+        capacity = max(_INITIAL_CAPACITY, 2 * rows)
+        matrix = np.empty((capacity, dim), dtype=np.float32)
+        if rows:
+            matrix[:rows] = self._matrix[:rows]
+        self._matrix = matrix
+    
+    def _prune(self):
+        """Drop index rows whose cache entry has expired or been removed."""
+        live = [i for i, key in enumerate(self._keys) if self._entry_path(key).exists()]
+        if len(live) == len(self._keys):
+            return
+        
+        logger.debug(f"Pruning {len(self._keys) - len(live)} stale semantic index rows")
+        self._keys = [self._keys[i] for i in live]
+        self._scopes = [self._scopes[i] for i in live]
+        self._key_set = set(self._keys)
+        self._matrix = self._matrix[live] if live else None
+    
+    def flush(self):
+        """Write index rows added since the last save."""
+        if self._unsaved_rows:
+            self._save_index()
+    
+    def _load_index(self):
+        """Load the prompt embedding index from disk."""
+        index_file = self.cache_dir / self.INDEX_FILE
+        
+        if not index_file.exists():
+            return
+        
+        try:
+            with np.load(index_file) as archive:
+                self._keys = archive["keys"].tolist()
+                self._scopes = archive["scopes"].tolist()
+                self._matrix = archive["matrix"]
+            self._key_set = set(self._keys)
+            self._prune()
+        except Exception as e:
+            logger.warning(f"Failed to load semantic LLM cache index: {e}")
+            self._keys, self._scopes, self._matrix = [], [], None
+            self._key_set = set()
+    
+    def _save_index(self):
+        """Save the prompt embedding index to disk."""
+        index_file = self.cache_dir / self.INDEX_FILE
+        self._prune()
+        
+        try:
+            rows = len(self._keys)
+            matrix = self._matrix[:rows] if self._matrix is not None else np.empty((0, 0), dtype=np.float32)
+            tmp_file = index_file.with_suffix(".tmp")
+            with open(tmp_file, 'wb') as f:
+                np.savez(f, keys=np.array(self._keys), scopes=np.array(self._scopes), matrix=matrix)
+            os.replace(tmp_file, index_file)
+            self._unsaved_rows = 0
+        except Exception as e:
+            logger.warning(f"Failed to save semantic LLM cache index: {e}")
+    
+    def _clear_extra(self):
+        self._keys, self._scopes, self._matrix = [], [], None
+        self._key_set = set()
+        self._unsaved_rows = 0
+        (self.cache_dir / self.INDEX_FILE).unlink(missing_ok=True)
+        self.semantic_hits = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        stats = super().get_stats()
+        stats["semantic_hits"] = self.semantic_hits
+        stats["indexed_prompts"] = len(self._keys)
+        return stats
+
+
+# Semantic caches whose unsaved index rows are written at exit; weak
+# references so registering does not keep caches alive
+_live_caches: "weakref.WeakSet[SemanticLLMCache]" = weakref.WeakSet()
+
+
+def _flush_caches():
+    """Flush every live semantic cache at interpreter exit."""
+    for cache in list(_live_caches):
+        cache.flush()
+
+
+atexit.register(_flush_caches)
@@ -4,16 +4,226 @@ LLM client abstraction for CLI-based AI tools.
 Supports Qoder CLI, Claude CLI, and other command-line AI assistants.
 """
 
+import os
 import json
+import time
+import atexit
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import functools
+import threading
+import selectors
 import subprocess
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 from pathlib import Path
 from dataclasses import dataclass
 
+from .llm_cache import LLMCache, SemanticLLMCache
+
 logger = logging.getLogger(__name__)
 
+# orjson is optional; its JSONDecodeError subclasses json.JSONDecodeError
+try:
+    import orjson
+    
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+
+# Pipe read size for CLI output; large reads keep syscalls low on big responses
+_READ_CHUNK_SIZE = 64 * 1024
+
+# Prompts longer than this go through stdin instead of argv (ARG_MAX)
+_STDIN_PROMPT_THRESHOLD = 16384
+
+def _decode(output: Union[bytes, str]) -> str:
+    """Decode CLI output, replacing invalid UTF-8."""
+    return output if isinstance(output, str) else output.decode(errors="replace")
+
+
+def _extract_json(content: str, want: str = "object") -> Any:
+    """
+    Parse JSON from a CLI response that may wrap it in markdown or prose.
+    
+    Tries the content as-is when it already looks like JSON, then the first
+    ```json (or plain ```) fenced block, then the span from the first opening to the last
+    closing bracket of the wanted kind.
+    
+    Args:
+        content: Response content
+        want: "object" or "array"
+        
+    Returns:
+        Parsed JSON value
+        
+    Raises:
+        json.JSONDecodeError: If no JSON could be parsed
+    """
+    content = content.strip()
+    
+    # Clean JSON (e.g. output_format="json") skips fence detection entirely
+    if content[:1] in ("[", "{"):
+        try:
+            return _json_loads(content)
+        except json.JSONDecodeError:
+            pass
+    
+    # partition finds and splits in one pass; an unclosed fence runs to the end
+    _, fence, rest = content.partition("```json")
+    if not fence:
+        _, fence, rest = content.partition("```")
+    if fence:
+        content = rest.partition("```")[0].strip()
+        try:
+            return _json_loads(content)
+        except json.JSONDecodeError:
+            pass
+    
+    open_char, close_char = ("{", "}") if want == "object" else ("[", "]")
+    start = content.find(open_char)
+    end = content.rfind(close_char)
+    if start != -1 and end > start:
+        return _json_loads(content[start:end + 1])
+    
+    return _json_loads(content)
+
+
+def _str_list(value: Any) -> List[str]:
+    """Coerce a task list field (list, single string or missing) to a list of str."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return []
+
+
+def _validate_tasks(tasks: Any) -> List[Dict]:
+    """
+    Check a parsed task split against the task schema.
+    
+    Entries without a description are dropped; optional fields get the
+    defaults the orchestrator uses, and scalar ids are coerced to str.
+    
+    Args:
+        tasks: Parsed JSON from a task-splitting response
+        
+    Returns:
+        List of task dictionaries
+        
+    Raises:
+        ValueError: If tasks is not a JSON array
+    """
+    if not isinstance(tasks, list):
+        raise ValueError(f"expected a JSON array of tasks, got {type(tasks).__name__}")
+    
+    valid = []
+    for index, task in enumerate(tasks):
+        if not isinstance(task, dict) or not isinstance(task.get("description"), str):
+            logger.warning(f"Skipping malformed task #{index + 1}: {task!r:.200}")
+            continue
+        
+        clean = {}
+        if task.get("id") is not None:
+            clean["id"] = str(task["id"])
+        clean["description"] = task["description"]
+        clean["subagent"] = str(task.get("subagent") or "architect")
+        clean["dependencies"] = _str_list(task.get("dependencies"))
+        clean["files_scope"] = _str_list(task.get("files_scope"))
+        clean["component"] = str(task.get("component") or "general")
+        valid.append(clean)
+    
+    return valid
+
+
+# Subagents the planner may assign tasks to
+SUBAGENTS: Tuple[str, ...] = (
+    "architect", "backend-dev", "frontend-dev", "database-specialist",
+    "testing-specialist", "devops-specialist", "security-specialist",
+    "documentation-specialist", "api-designer", "performance-specialist",
+    "migration-specialist", "discovery-specialist"
+)
+SUBAGENT_LIST = ", ".join(SUBAGENTS)
+
+# Static parts of the Qoder planning prompts, built once at import
+
+_TASK_SPLIT_HEADER = "Analyze the provided high-level objective and project context to create a highly specific, granular execution plan.\n\nOBJECTIVE:\n"
+
+_TASK_SPLIT_GUIDE = "AVAILABLE SUBAGENTS:\n" + SUBAGENT_LIST + """\n\n### Planning Strategy:
+1. **Discovery First**: IF the objective involves setting up new systems, migrating legacy code, or is otherwise broad/ambiguous, the VERY FIRST task(s) MUST be assigned to 'discovery-specialist'. Use them to audit the codebase, identify feature gaps, or research technical feasibility.
+2. **Impact Analysis**: Identify exactly which files, components, and modules will be affected.
+3. **Atomic Breakdown**: Split large migrations or feature additions into small, verifiable steps. AVOID generic tasks like "Build backend".
+4. **Architect vs. Discovery**: Use 'discovery-specialist' to FIND information and gaps (e.g., "Audit backend for missing Supabase integration"). Use 'architect' to DESIGN new structures or define API contracts (e.g., "Design Supabase schema based on audit findings").
+5. **Specific Descriptions**: Task descriptions MUST be actionable. **BAD**: "Setup server". **GOOD**: "Create .env file with Supabase credentials" or "Define 'users' table schema in Supabase".
+
+### Requirements for each Task:
+- **id**: Unique identifier (e.g., t1, t2).
+- **description**: Must be specific. **INCLUDE** file paths when possible.
+- **subagent**: One of the available subagents.
+- **dependencies**: List of task IDs that MUST be completed before this one.
+- **files_scope**: List of EXACT file paths or directory patterns.
+- **component**: Categorize as backend, frontend, general, etc.
+
+### Example Plan for "Add Auth":
+[
+  {
+    "id": "t1",
+    "description": "Analyze existing auth flow and identify required Supabase edge functions",
+    "subagent": "discovery-specialist",
+    "dependencies": [],
+    "files_scope": ["lib/auth/**"],
+    "component": "backend"
+  },
+  {
+    "id": "t2",
+    "description": "Design Supabase Auth configuration and session management protocol",
+    "subagent": "architect",
+    "dependencies": ["t1"],
+    "files_scope": ["docs/auth_design.md"],
+    "component": "general"
+  }
+]
+
+Return a JSON array of tasks:
+"""
+
+_OBJECTIVE_HEADER = "Analyze if the original objective has been met based on completed tasks.\n\nORIGINAL OBJECTIVE:\n"
+
+_OBJECTIVE_FORMAT = """Return a JSON object with this structure:
+{
+  "met": true/false,
+  "reasoning": "Explanation of why objectives are/aren't met",
+  "missing": ["List of missing items if not met"],
+  "next_steps": ["Suggested next steps if not met"]
+}
+"""
+
+_LEARNING_HEADER = "Analyze this task execution and suggest wiki updates if the approach differs from documented patterns.\n\nTASK:\n"
+
+_LEARNING_FORMAT = """If the execution revealed new patterns, better approaches, or important learnings, suggest a wiki update.
+Return JSON:
+{
+  "should_update": true/false,
+  "suggested_content": "Updated wiki content if should_update is true",
+  "reasoning": "Why this update is valuable"
+}
+"""
+
+
+@functools.lru_cache(maxsize=32)
+def _build_task_split_prompt(prompt: str, context: str) -> str:
+    """Build the Qoder task-splitting prompt; repeated requests reuse the string."""
+    return f"{_TASK_SPLIT_HEADER}{prompt}\n\nPROJECT CONTEXT:\n{context}\n\n{_TASK_SPLIT_GUIDE}"
+
 
 @dataclass
 class LLMResponse:
@@ -24,17 +234,73 @@ class LLMResponse:
     error: Optional[str] = None
 
 
+class _Flight:
+    """A CLI request in progress that identical requests wait on."""
+    __slots__ = ("done", "response")
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[LLMResponse] = None
+
+
 class CLIBasedLLMClient(ABC):
     """Abstract base class for CLI-based LLM clients."""
     
-    def __init__(self, timeout: int = 60):
+    # Verified CLI executable path per tool, shared by all instances for the process
+    _verified: Dict[str, str] = {}
+    
+    # Whether each CLI executable documents reading the prompt from stdin
+    _stdin_support: Dict[str, bool] = {}
+    
+    # Prompt argument that makes the CLI read the prompt from stdin
+    # (None if the CLI can't, in which case prompts always go in argv)
+    STDIN_PROMPT: Optional[str] = None
+    
+    # Options left out of cache keys because the prompt already carries
+    # their content
+    UNKEYED_OPTIONS: frozenset = frozenset()
+    
+    def __init__(
+        self,
+        timeout: int = 60,
+        cache: Optional[LLMCache] = None,
+        cache_ttl_days: int = 7,
+        fast_spawn: bool = True,
+        max_context_chars: int = 0
+    ):
         """
         Initialize CLI-based LLM client.
         
         Args:
             timeout: Command timeout in seconds
+            cache: Response cache for repeated prompts (None disables caching)
+            cache_ttl_days: Maximum age of a cached response
+            fast_spawn: Spawn the CLI with close_fds=False, skipping the
+                child's close-every-fd loop and allowing posix_spawn. Python
+                opens fds non-inheritable, so only fds explicitly marked
+                inheritable leak into the CLI; disable if the host process
+                creates such fds.
+            max_context_chars: Contexts longer than this are replaced by an
+                LLM-written summary before prompting (0 disables)
         """
         self.timeout = timeout
+        self.cache = cache
+        self.cache_ttl_seconds = cache_ttl_days * 86400
+        self.close_fds = not fast_spawn
+        self.max_context_chars = max_context_chars
+        
+        # Condensed contexts by SHA-256 of the original (see _compact_context)
+        self._summary_cache: Dict[str, str] = {}
+        
+        # Requests currently running, by request key (see execute)
+        self._inflight: Dict[str, _Flight] = {}
+        self._inflight_lock = threading.Lock()
+        self._inflight_async: Dict[Tuple[int, str], asyncio.Future] = {}
+        
+        # Request keys made with semantic_cache=True; only their prompts are
+        # embedded into the semantic index (see _finish)
+        self._semantic_keys: Set[str] = set()
+        
         self._verify_installation()
     
     @abstractmethod
@@ -42,66 +308,468 @@ class CLIBasedLLMClient(ABC):
         """Verify the CLI tool is installed."""
         pass
     
+    @classmethod
+    def reset_verification(cls):
+        """Forget verified installations so the next client re-checks."""
+        CLIBasedLLMClient._verified.clear()
+        CLIBasedLLMClient._stdin_support.clear()
+    
+    def _locate_cli(self, tool: str, names: Sequence[str], label: str) -> Optional[str]:
+        """
+        Resolve a CLI executable on PATH, running `--version` once per process.
+        
+        Args:
+            tool: Key for the verification cache
+            names: Executable names to try, in order
+            label: Tool name for messages
+            
+        Returns:
+            Absolute path of the executable, or None if none of names is on PATH
+            
+        Raises:
+            RuntimeError: If the executable doesn't run
+        """
+        path = self._verified.get(tool)
+        if path:
+            return path
+        
+        path = next(filter(None, map(shutil.which, names)), None)
+        if path is None:
+            return None
+        
+        try:
+            result = subprocess.run(
+                [path, "--version"],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+        except (subprocess.TimeoutExpired, OSError) as e:
+            raise RuntimeError(f"{label} verification failed: {e}")
+        
+        if result.returncode != 0:
+            raise RuntimeError(f"{label} not working")
+        
+        logger.info(f"{label} verified: {result.stdout.strip()}")
+        self._verified[tool] = path
+        return path
+    
     @abstractmethod
     def _build_command(self, prompt: str, **kwargs) -> List[str]:
         """Build the CLI command."""
         pass
     
+    def _build_invocation(self, prompt: str, **kwargs) -> Tuple[List[str], Optional[str]]:
+        """
+        Build the CLI command and the input to pipe to it.
+        
+        Large prompts are sent on stdin when the CLI supports it.
+        
+        Returns:
+            Tuple of (command, stdin payload or None)
+        """
+        if self.STDIN_PROMPT is not None and len(prompt) > _STDIN_PROMPT_THRESHOLD:
+            return self._build_command(self.STDIN_PROMPT, **kwargs), prompt
+        return self._build_command(prompt, **kwargs), None
+    
     def execute(self, prompt: str, **kwargs) -> LLMResponse:
         """
         Execute a prompt via the CLI tool.
         
         Args:
             prompt: The prompt to send
-            **kwargs: Additional arguments for the CLI
+            **kwargs: Additional arguments for the CLI; pass no_cache=True
+                to bypass the response cache, or semantic_cache=True to accept
+                the response to a near-identical earlier prompt
             
         Returns:
             LLMResponse with the result
         """
+        request_key, cached = self._check_cache(prompt, kwargs)
+        if cached is not None:
+            return cached
+        if request_key is None:
+            return self._execute_uncached(prompt, kwargs, None)
+        
+        # Single-flight: concurrent identical requests share one CLI run
+        with self._inflight_lock:
+            flight = self._inflight.get(request_key)
+            owner = flight is None
+            if owner:
+                flight = self._inflight[request_key] = _Flight()
+        
+        if not owner:
+            flight.done.wait()
+            return flight.response or self._failure_response(RuntimeError("shared request aborted"))
+        
         try:
-            cmd = self._build_command(prompt, **kwargs)
-            logger.debug(f"Executing command: {' '.join(cmd)}")
+            flight.response = self._execute_uncached(prompt, kwargs, request_key)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[request_key]
+            self._semantic_keys.discard(request_key)
+            flight.done.set()
+        return flight.response
+    
+    def _execute_uncached(self, prompt: str, kwargs: Dict, cache_key: Optional[str]) -> LLMResponse:
+        """Run a prompt through the CLI and build its response."""
+        try:
+            cmd, stdin_payload = self._build_invocation(prompt, **kwargs)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executing command: %s", " ".join(cmd))
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+            returncode, stdout, stderr = self._run_command(cmd, stdin_payload)
+            return self._finish(returncode, stdout, stderr, cache_key, prompt, kwargs)
+                
+        except subprocess.TimeoutExpired:
+            return self._timeout_response()
+        except Exception as e:
+            return self._failure_response(e)
+    
+    def _run_command(self, cmd: List[str], stdin_payload: Optional[str] = None) -> Tuple[int, bytes, bytes]:
+        """
+        Run a CLI command, draining both pipes in large chunks.
+        
+        Args:
+            cmd: Command to run
+            stdin_payload: Text to write to the command's stdin
+            
+        Returns:
+            Tuple of (return code, stdout, stderr), output undecoded
+            
+        Raises:
+            subprocess.TimeoutExpired: If the command exceeds the timeout
+        """
+        if os.name == "nt":
+            # selectors can't wait on pipes on Windows
+            stdin_bytes = stdin_payload.encode() if stdin_payload is not None else None
+            result = subprocess.run(cmd, input=stdin_bytes, capture_output=True, timeout=self.timeout)
+            return result.returncode, result.stdout, result.stderr
+        
+        deadline = time.monotonic() + self.timeout
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if stdin_payload is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=self.close_fds
+        )
+        buffers = {proc.stdout.fileno(): bytearray(), proc.stderr.fileno(): bytearray()}
+        
+        with proc, selectors.DefaultSelector() as selector:
+            for fd in buffers:
+                selector.register(fd, selectors.EVENT_READ)
+            
+            pending = None
+            if stdin_payload is not None:
+                pending = memoryview(stdin_payload.encode())
+                os.set_blocking(proc.stdin.fileno(), False)
+                selector.register(proc.stdin.fileno(), selectors.EVENT_WRITE)
             
-            if result.returncode == 0:
-                return LLMResponse(
-                    content=result.stdout.strip(),
-                    raw_output=result.stdout,
-                    success=True
-                )
-            else:
-                logger.error(f"CLI command failed: {result.stderr}")
-                return LLMResponse(
-                    content="",
-                    raw_output=result.stderr,
-                    success=False,
-                    error=result.stderr
-                )
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    proc.kill()
+                    raise subprocess.TimeoutExpired(cmd, self.timeout)
                 
+                for key, _ in selector.select(remaining):
+                    if key.fd not in buffers:
+                        # Feed stdin as the pipe drains; close it when done
+                        try:
+                            pending = pending[os.write(key.fd, pending[:_READ_CHUNK_SIZE]):]
+                        except BlockingIOError:
+                            continue
+                        except BrokenPipeError:
+                            pending = pending[:0]
+                        if not pending:
+                            selector.unregister(key.fd)
+                            proc.stdin.close()
+                        continue
+                    
+                    chunk = os.read(key.fd, _READ_CHUNK_SIZE)
+                    if chunk:
+                        buffers[key.fd] += chunk
+                    else:
+                        selector.unregister(key.fd)
+            
+            # The child can close its pipes and keep running; kill and reap
+            # it on timeout so leaving `with proc` can't block
+            try:
+                returncode = proc.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                raise subprocess.TimeoutExpired(cmd, self.timeout)
+        
+        stdout, stderr = buffers.values()
+        return returncode, stdout, stderr
+    
+    async def execute_async(self, prompt: str, **kwargs) -> LLMResponse:
+        """
+        Execute a prompt via the CLI tool without blocking the event loop.
+        
+        Args:
+            prompt: The prompt to send
+            **kwargs: Same as execute
+            
+        Returns:
+            LLMResponse with the result
+        """
+        request_key, cached = self._check_cache(prompt, kwargs)
+        if cached is not None:
+            return cached
+        if request_key is None:
+            return await self._execute_uncached_async(prompt, kwargs, None)
+        
+        # Single-flight, as in execute; futures belong to the running loop
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), request_key)
+        future = self._inflight_async.get(flight_key)
+        if future is not None:
+            return await asyncio.shield(future)
+        
+        future = self._inflight_async[flight_key] = loop.create_future()
+        try:
+            response = await self._execute_uncached_async(prompt, kwargs, request_key)
+        except BaseException:
+            # Owner cancelled: waiters see the cancellation too
+            future.cancel()
+            raise
+        finally:
+            del self._inflight_async[flight_key]
+            self._semantic_keys.discard(request_key)
+        
+        future.set_result(response)
+        return response
+    
+    async def _execute_uncached_async(
+        self,
+        prompt: str,
+        kwargs: Dict,
+        cache_key: Optional[str]
+    ) -> LLMResponse:
+        """Run a prompt through the CLI without blocking and build its response."""
+        try:
+            cmd, stdin_payload = self._build_invocation(prompt, **kwargs)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Executing command: %s", " ".join(cmd))
+            
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if stdin_payload is not None else None,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                close_fds=self.close_fds
+            )
+            stdin_bytes = stdin_payload.encode() if stdin_payload is not None else None
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(stdin_bytes), self.timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                return self._timeout_response()
+            
+            return self._finish(proc.returncode, stdout, stderr, cache_key, prompt, kwargs)
+            
         except subprocess.TimeoutExpired:
-            error_msg = f"CLI command timed out after {self.timeout}s"
-            logger.error(error_msg)
+            return self._timeout_response()
+        except Exception as e:
+            return self._failure_response(e)
+    
+    def batch_execute(self, prompts: List[str], **kwargs) -> List[LLMResponse]:
+        """
+        Execute independent prompts concurrently.
+        
+        Must not be called from a running event loop; gather execute_async
+        calls there instead.
+        
+        Args:
+            prompts: Prompts to send
+            **kwargs: Arguments passed to every execute_async call
+            
+        Returns:
+            LLMResponses in the order of prompts
+        """
+        async def run_all():
+            return await asyncio.gather(
+                *(self.execute_async(prompt, **kwargs) for prompt in prompts)
+            )
+        
+        return asyncio.run(run_all())
+    
+    def _key_options(self, kwargs: Dict) -> Dict:
+        """Options that identify a request, minus UNKEYED_OPTIONS."""
+        if self.UNKEYED_OPTIONS.isdisjoint(kwargs):
+            return kwargs
+        return {k: v for k, v in kwargs.items() if k not in self.UNKEYED_OPTIONS}
+    
+    def _check_cache(self, prompt: str, kwargs: Dict) -> Tuple[Optional[str], Optional[LLMResponse]]:
+        """
+        Look up a prompt in the response cache.
+        
+        Removes the cache control flags from kwargs.
+        
+        Returns:
+            Tuple of (request key, or None if no_cache was given; cached
+            response or None)
+        """
+        no_cache = kwargs.pop("no_cache", False)
+        semantic_cache = kwargs.pop("semantic_cache", False)
+        
+        if no_cache:
+            return None, None
+        
+        provider = type(self).__name__
+        key_options = self._key_options(kwargs)
+        cache_key = LLMCache.make_key(provider, prompt, key_options)
+        if self.cache is None:
+            return cache_key, None
+        
+        cached = self.cache.get(cache_key, self.cache_ttl_seconds)
+        if cached is None and semantic_cache and isinstance(self.cache, SemanticLLMCache):
+            cached = self.cache.get_similar(provider, prompt, key_options, self.cache_ttl_seconds)
+        if cached is None:
+            if semantic_cache:
+                self._semantic_keys.add(cache_key)
+            return cache_key, None
+        
+        return cache_key, LLMResponse(
+            content=cached["content"],
+            raw_output=cached["raw_output"],
+            success=True
+        )
+    
+    def _finish(
+        self,
+        returncode: int,
+        stdout: Union[bytes, str],
+        stderr: Union[bytes, str],
+        cache_key: Optional[str],
+        prompt: str,
+        kwargs: Dict
+    ) -> LLMResponse:
+        """
+        Build the response for a completed command, caching successes.
+        
+        Only the stream the response uses is decoded: stdout on success,
+        stderr on failure.
+        """
+        if returncode == 0:
+            stdout = _decode(stdout)
+            content = stdout.strip()
+            if cache_key is not None and self.cache is not None:
+                self.cache.set(cache_key, content, stdout)
+                # Embedding costs a model call, so only index prompts whose
+                # callers also look them up semantically
+                if cache_key in self._semantic_keys and isinstance(self.cache, SemanticLLMCache):
+                    self.cache.index_prompt(cache_key, type(self).__name__, prompt, self._key_options(kwargs))
+            
             return LLMResponse(
-                content="",
-                raw_output="",
-                success=False,
-                error=error_msg
+                content=content,
+                raw_output=stdout,
+                success=True
             )
-        except Exception as e:
-            logger.error(f"CLI execution failed: {e}")
+        else:
+            stderr = _decode(stderr)
+            logger.error("CLI command failed: %s", stderr)
             return LLMResponse(
                 content="",
-                raw_output="",
+                raw_output=stderr,
                 success=False,
-                error=str(e)
+                error=stderr
             )
     
+    def _timeout_response(self) -> LLMResponse:
+        """Build the response for a command that exceeded the timeout."""
+        error_msg = f"CLI command timed out after {self.timeout}s"
+        logger.error(error_msg)
+        return LLMResponse(
+            content="",
+            raw_output="",
+            success=False,
+            error=error_msg
+        )
+    
+    def _failure_response(self, e: Exception) -> LLMResponse:
+        """Build the response for a command that could not be run."""
+        logger.error(f"CLI execution failed: {e}")
+        return LLMResponse(
+            content="",
+            raw_output="",
+            success=False,
+            error=str(e)
+        )
+    
+    def _compact_context(self, context: str) -> str:
+        """
+        Condense an oversized context so prompts stay small.
+        
+        Summaries are cached per context, so a context that doesn't change
+        between calls is summarized once.
+        
+        Args:
+            context: Context to embed in a prompt
+            
+        Returns:
+            The context itself if short enough (or summarizing fails),
+            otherwise its summary
+        """
+        if not self.max_context_chars or len(context) <= self.max_context_chars:
+            return context
+        
+        digest = hashlib.sha256(context.encode()).hexdigest()
+        summary = self._summary_cache.get(digest)
+        if summary is not None:
+            return summary
+        
+        summary_prompt = (
+            f"Summarize the following project context in under {self.max_context_chars} "
+            "characters. Keep file paths, component names, conventions and constraints; "
+            "drop prose and examples.\n\n"
+            f"{context[:self.max_context_chars * 4]}"
+        )
+        response = self.execute(summary_prompt)
+        if not response.success or not response.content:
+            logger.warning("Context summarization failed; using full context")
+            return context
+        
+        # The summary is lossy, so say so where the user will see it
+        logger.warning(f"Context condensed from {len(context)} to {len(response.content)} chars "
+                       f"(llm.max_context_chars={self.max_context_chars})")
+        self._summary_cache[digest] = response.content
+        return response.content
+    
+    async def split_tasks_async(self, prompt: str, context: str) -> List[Dict]:
+        """Async variant of split_tasks; the CLI call runs in a worker thread."""
+        return await self._run_in_executor(self.split_tasks, prompt, context)
+    
+    async def analyze_objective_async(
+        self,
+        original_prompt: str,
+        completed_tasks: List[Dict],
+        context: str
+    ) -> Dict:
+        """Async variant of analyze_objective; the CLI call runs in a worker thread."""
+        return await self._run_in_executor(
+            self.analyze_objective, original_prompt, completed_tasks, context
+        )
+    
+    async def suggest_learning_async(
+        self,
+        task_description: str,
+        task_output: str,
+        existing_wiki: str
+    ) -> Optional[str]:
+        """Async variant of suggest_learning; the CLI call runs in a worker thread."""
+        return await self._run_in_executor(
+            self.suggest_learning, task_description, task_output, existing_wiki
+        )
+    
+    async def _run_in_executor(self, func, *args):
+        """Run a blocking client method in the loop's default executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+    
     @abstractmethod
     def split_tasks(self, prompt: str, context: str) -> List[Dict]:
         """Split a high-level prompt into granular tasks."""
@@ -136,25 +804,49 @@ class CLIBasedLLMClient(ABC):
 class QoderCLIClient(CLIBasedLLMClient):
     """Qoder CLI-based LLM client."""
     
+    # `-p -` reads the prompt from stdin on Qoder CLI builds whose --help
+    # mentions stdin; older builds get every prompt in argv
+    STDIN_PROMPT = "-"
+    
     def _verify_installation(self):
         """Verify Qoder CLI is installed."""
+        self.cli_path = self._locate_cli("qoder", ["qoder"], "Qoder CLI")
+        if self.cli_path is None:
+            raise RuntimeError("Qoder CLI not found on PATH")
+        
+        if not self._reads_stdin_prompt():
+            self.STDIN_PROMPT = None
+    
+    def _reads_stdin_prompt(self) -> bool:
+        """
+        Check `qoder --help` for stdin prompt support, once per executable.
+        
+        Returns:
+            True if the help text mentions stdin
+        """
+        supported = self._stdin_support.get(self.cli_path)
+        if supported is not None:
+            return supported
+        
         try:
             result = subprocess.run(
-                ["qoder", "--version"],
+                [self.cli_path, "--help"],
                 capture_output=True,
                 text=True,
                 timeout=5
             )
-            if result.returncode == 0:
-                logger.info(f"Qoder CLI verified: {result.stdout.strip()}")
-            else:
-                raise RuntimeError("Qoder CLI not found or not working")
-        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-            raise RuntimeError(f"Qoder CLI verification failed: {e}")
+            supported = "stdin" in (result.stdout + result.stderr).lower()
+        except (subprocess.TimeoutExpired, OSError):
+            supported = False
+        
+        if not supported:
+            logger.info("Qoder CLI doesn't document stdin prompts; long prompts go in argv")
+        self._stdin_support[self.cli_path] = supported
+        return supported
     
     def _build_command(self, prompt: str, **kwargs) -> List[str]:
         """Build Qoder CLI command."""
-        cmd = ["qoder"]
+        cmd = [self.cli_path]
         
         # Use --yolo to avoid interactive permission prompts
         cmd.append("--yolo")
@@ -180,62 +872,8 @@ class QoderCLIClient(CLIBasedLLMClient):
         Returns:
             List of task dictionaries
         """
-        # Build a structured prompt for task splitting
-        subagent_list = ", ".join([
-            "architect", "backend-dev", "frontend-dev", "database-specialist",
-            "testing-specialist", "devops-specialist", "security-specialist",
-            "documentation-specialist", "api-designer", "performance-specialist",
-            "migration-specialist", "discovery-specialist"
-        ])
-        
-        task_split_prompt = f"""Analyze the provided high-level objective and project context to create a highly specific, granular execution plan.
-
-OBJECTIVE:
-{prompt}
-
-PROJECT CONTEXT:
-{context}
-
-AVAILABLE SUBAGENTS:
-{subagent_list}
-
-### Planning Strategy:
-1. **Discovery First**: IF the objective involves setting up new systems, migrating legacy code, or is otherwise broad/ambiguous, the VERY FIRST task(s) MUST be assigned to 'discovery-specialist'. Use them to audit the codebase, identify feature gaps, or research technical feasibility.
-2. **Impact Analysis**: Identify exactly which files, components, and modules will be affected.
-3. **Atomic Breakdown**: Split large migrations or feature additions into small, verifiable steps. AVOID generic tasks like "Build backend".
-4. **Architect vs. Discovery**: Use 'discovery-specialist' to FIND information and gaps (e.g., "Audit backend for missing Supabase integration"). Use 'architect' to DESIGN new structures or define API contracts (e.g., "Design Supabase schema based on audit findings").
-5. **Specific Descriptions**: Task descriptions MUST be actionable. **BAD**: "Setup server". **GOOD**: "Create .env file with Supabase credentials" or "Define 'users' table schema in Supabase".
-
-### Requirements for each Task:
-- **id**: Unique identifier (e.g., t1, t2).
-- **description**: Must be specific. **INCLUDE** file paths when possible.
-- **subagent**: One of the available subagents.
-- **dependencies**: List of task IDs that MUST be completed before this one.
-- **files_scope**: List of EXACT file paths or directory patterns.
-- **component**: Categorize as backend, frontend, general, etc.
-
-### Example Plan for "Add Auth":
-[
-  {{
-    "id": "t1",
-    "description": "Analyze existing auth flow and identify required Supabase edge functions",
-    "subagent": "discovery-specialist",
-    "dependencies": [],
-    "files_scope": ["lib/auth/**"],
-    "component": "backend"
-  }},
-  {{
-    "id": "t2",
-    "description": "Design Supabase Auth configuration and session management protocol",
-    "subagent": "architect",
-    "dependencies": ["t1"],
-    "files_scope": ["docs/auth_design.md"],
-    "component": "general"
-  }}
-]
-
-Return a JSON array of tasks:
-"""
+        context = self._compact_context(context)
+        task_split_prompt = _build_task_split_prompt(prompt, context)
         
         response = self.execute(task_split_prompt, output_format="json")
         
@@ -245,39 +883,14 @@ Return a JSON array of tasks:
         
         # Try to parse JSON from response
         try:
-            content = response.content.strip()
-            
-            # 1. Try to extract JSON from markdown code blocks
-            json_start = -1
-            if "```json" in content:
-                json_start = content.find("```json") + 7
-            elif "```" in content:
-                json_start = content.find("```") + 3
-                
-            if json_start != -1:
-                json_end = content.find("```", json_start)
-                if json_end != -1:
-                    content = content[json_start:json_end].strip()
-            
-            # 2. If parsing fails, try to find the first '[' and last ']' 
-            # (handles cases with preamble/postamble text)
-            try:
-                tasks = json.loads(content)
-            except json.JSONDecodeError:
-                start_idx = content.find("[")
-                end_idx = content.rfind("]")
-                if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                    content = content[start_idx:end_idx+1].strip()
-                    tasks = json.loads(content)
-                else:
-                    raise # Re-raise to be caught by outer block
+            tasks = _validate_tasks(_extract_json(response.content, want="array"))
             
             logger.info(f"Successfully split into {len(tasks)} tasks")
             return tasks
             
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"Failed to parse task split response as JSON: {e}")
-            logger.debug(f"Raw content was: {response.content}")
+            logger.debug("Raw content was: %s", response.content)
             return []
 
     def analyze_codebase(self, project_path: str) -> str:
@@ -296,7 +909,8 @@ Return a JSON array of tasks:
         Keep it concise but informative for a development orchestrator.
         """
         
-        response = self.execute(analysis_prompt)
+        # The prompt names only the path, so a cached answer would go stale
+        response = self.execute(analysis_prompt, no_cache=True)
         
         if not response.success:
             logger.error("Codebase analysis failed")
@@ -321,25 +935,12 @@ Return a JSON array of tasks:
         Returns:
             Dict with 'met' (bool) and 'reasoning' (str)
         """
-        analysis_prompt = f"""Analyze if the original objective has been met based on completed tasks.
-
-ORIGINAL OBJECTIVE:
-{original_prompt}
-
-COMPLETED TASKS:
-{json.dumps(completed_tasks, indent=2)}
-
-CURRENT PROJECT STATE:
-{context}
-
-Return a JSON object with this structure:
-{{
-  "met": true/false,
-  "reasoning": "Explanation of why objectives are/aren't met",
-  "missing": ["List of missing items if not met"],
-  "next_steps": ["Suggested next steps if not met"]
-}}
-"""
+        context = self._compact_context(context)
+        analysis_prompt = (
+            f"{_OBJECTIVE_HEADER}{original_prompt}\n\n"
+            f"COMPLETED TASKS:\n{_json_dumps(completed_tasks)}\n\n"
+            f"CURRENT PROJECT STATE:\n{context}\n\n{_OBJECTIVE_FORMAT}"
+        )
         
         response = self.execute(analysis_prompt, output_format="json")
         
@@ -347,19 +948,7 @@ Return a JSON object with this structure:
             return {"met": False, "reasoning": "Analysis failed", "missing": [], "next_steps": []}
         
         try:
-            content = response.content
-            
-            # Extract JSON from markdown
-            if "```json" in content:
-                start = content.find("```json") + 7
-                end = content.find("```", start)
-                content = content[start:end].strip()
-            elif "```" in content:
-                start = content.find("```") + 3
-                end = content.find("```", start)
-                content = content[start:end].strip()
-            
-            result = json.loads(content)
+            result = _extract_json(response.content)
             logger.info(f"Objective analysis: {result.get('met', False)}")
             return result
             
@@ -384,25 +973,12 @@ Return a JSON object with this structure:
         Returns:
             Suggested wiki update or None
         """
-        learning_prompt = f"""Analyze this task execution and suggest wiki updates if the approach differs from documented patterns.
-
-TASK:
-{task_description}
-
-EXECUTION OUTPUT:
-{task_output}
-
-EXISTING WIKI:
-{existing_wiki}
-
-If the execution revealed new patterns, better approaches, or important learnings, suggest a wiki update.
-Return JSON:
-{{
-  "should_update": true/false,
-  "suggested_content": "Updated wiki content if should_update is true",
-  "reasoning": "Why this update is valuable"
-}}
-"""
+        existing_wiki = self._compact_context(existing_wiki)
+        learning_prompt = (
+            f"{_LEARNING_HEADER}{task_description}\n\n"
+            f"EXECUTION OUTPUT:\n{task_output}\n\n"
+            f"EXISTING WIKI:\n{existing_wiki}\n\n{_LEARNING_FORMAT}"
+        )
         
         response = self.execute(learning_prompt, output_format="json")
         
@@ -410,19 +986,7 @@ Return JSON:
             return None
         
         try:
-            content = response.content
-            
-            # Extract JSON
-            if "```json" in content:
-                start = content.find("```json") + 7
-                end = content.find("```", start)
-                content = content[start:end].strip()
-            elif "```" in content:
-                start = content.find("```") + 3
-                end = content.find("```", start)
-                content = content[start:end].strip()
-            
-            result = json.loads(content)
+            result = _extract_json(response.content)
             
             if result.get("should_update", False):
                 logger.info(f"Learning suggestion: {result.get('reasoning', '')}")
@@ -438,43 +1002,44 @@ Return JSON:
 class ClaudeCLIClient(CLIBasedLLMClient):
     """Claude CLI-based LLM client."""
     
+    # Without a prompt argument, Claude CLI reads the prompt from stdin
+    STDIN_PROMPT = ""
+    
+    # context_file is a per-process temp path; its content is in the prompt
+    UNKEYED_OPTIONS = frozenset({"context_file"})
+    
+    def __init__(self, *args, **kwargs):
+        # Context files by content hash, reused across split_tasks calls
+        self._context_files: Dict[str, str] = {}
+        self._context_dir: Optional[str] = None
+        super().__init__(*args, **kwargs)
+    
+    def _get_context_file(self, context: str) -> str:
+        """Get a file holding context, writing it only the first time."""
+        digest = hashlib.sha256(context.encode()).hexdigest()[:16]
+        path = self._context_files.get(digest)
+        if path is not None and os.path.exists(path):
+            return path
+        
+        if self._context_dir is None:
+            self._context_dir = tempfile.mkdtemp(prefix="qoder_ctx_")
+            atexit.register(shutil.rmtree, self._context_dir, ignore_errors=True)
+        
+        path = os.path.join(self._context_dir, f"{digest}.txt")
+        Path(path).write_text(context)
+        self._context_files[digest] = path
+        return path
+    
     def _verify_installation(self):
         """Verify Claude CLI is installed."""
-        try:
-            # Claude CLI might use 'claude' or 'claude-cli' command
-            result = subprocess.run(
-                ["claude", "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                logger.info(f"Claude CLI verified: {result.stdout.strip()}")
-                self.cli_command = "claude"
-            else:
-                raise RuntimeError("Claude CLI not found or not working")
-        except FileNotFoundError:
-            # Try alternative command name
-            try:
-                result = subprocess.run(
-                    ["claude-cli", "--version"],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    self.cli_command = "claude-cli"
-                    logger.info(f"Claude CLI verified: {result.stdout.strip()}")
-                else:
-                    raise RuntimeError("Claude CLI not found")
-            except FileNotFoundError:
-                raise RuntimeError("Claude CLI not installed. Install from: https://claude.ai/cli")
-        except subprocess.TimeoutExpired as e:
-            raise RuntimeError(f"Claude CLI verification timed out: {e}")
+        # Claude CLI might use 'claude' or 'claude-cli' command
+        self.cli_path = self._locate_cli("claude", ["claude", "claude-cli"], "Claude CLI")
+        if self.cli_path is None:
+            raise RuntimeError("Claude CLI not installed. Install from: https://claude.ai/cli")
     
     def _build_command(self, prompt: str, **kwargs) -> List[str]:
         """Build Claude CLI command."""
-        cmd = [self.cli_command]
+        cmd = [self.cli_path]
         
         # Claude CLI typically uses: claude "prompt"
         # or: claude --file context.txt "prompt"
@@ -483,14 +1048,16 @@ class ClaudeCLIClient(CLIBasedLLMClient):
         if "context_file" in kwargs:
             cmd.extend(["--file", kwargs["context_file"]])
         
-        # Add the prompt
-        cmd.append(prompt)
+        # Add the prompt (empty when it is piped through stdin)
+        if prompt:
+            cmd.append(prompt)
         
         return cmd
     
     def split_tasks(self, prompt: str, context: str) -> List[Dict]:
         """Split tasks using Claude CLI."""
         # Similar structure to Qoder but adapted for Claude CLI
+        context = self._compact_context(context)
         task_split_prompt = f"""Break down this objective into granular tasks.
 
 OBJECTIVE: {prompt}
@@ -499,11 +1066,8 @@ CONTEXT: {context}
 
 Return JSON array of tasks with: id, description, subagent, dependencies, files_scope, component"""
         
-        # Write context to temp file for Claude CLI
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            f.write(context)
-            context_file = f.name
+        # Context goes to Claude CLI as a file, shared by calls with the same context
+        context_file = self._get_context_file(context)
         
         try:
             response = self.execute(task_split_prompt, context_file=context_file)
@@ -511,22 +1075,12 @@ Return JSON array of tasks with: id, description, subagent, dependencies, files_
             if not response.success:
                 return []
             
-            # Parse JSON from response
-            content = response.content
-            if "```json" in content:
-                start = content.find("```json") + 7
-                end = content.find("```", start)
-                content = content[start:end].strip()
-            
-            tasks = json.loads(content)
+            tasks = _validate_tasks(_extract_json(response.content, want="array"))
             return tasks
             
         except Exception as e:
             logger.error(f"Claude task splitting failed: {e}")
             return []
-        finally:
-            # Clean up temp file
-            Path(context_file).unlink(missing_ok=True)
     
     def analyze_objective(
         self,
@@ -539,7 +1093,7 @@ Return JSON array of tasks with: id, description, subagent, dependencies, files_
         analysis_prompt = f"""Has this objective been met?
 
 OBJECTIVE: {original_prompt}
-COMPLETED: {json.dumps(completed_tasks, indent=2)}
+COMPLETED: {_json_dumps(completed_tasks)}
 
 Return JSON: {{"met": bool, "reasoning": str, "missing": [], "next_steps": []}}"""
         
@@ -549,13 +1103,7 @@ Return JSON: {{"met": bool, "reasoning": str, "missing": [], "next_steps": []}}"
             return {"met": False, "reasoning": "Analysis failed", "missing": [], "next_steps": []}
         
         try:
-            content = response.content
-            if "```json" in content:
-                start = content.find("```json") + 7
-                end = content.find("```", start)
-                content = content[start:end].strip()
-            
-            return json.loads(content)
+            return _extract_json(response.content)
         except:
             return {"met": False, "reasoning": "Parse error", "missing": [], "next_steps": []}
     
@@ -566,6 +1114,7 @@ Return JSON: {{"met": bool, "reasoning": str, "missing": [], "next_steps": []}}"
         existing_wiki: str
     ) -> Optional[str]:
         """Suggest learning using Claude CLI."""
+        existing_wiki = self._compact_context(existing_wiki)
         learning_prompt = f"""Should we update the wiki based on this task?
 
 TASK: {task_description}
@@ -580,13 +1129,7 @@ Return JSON: {{"should_update": bool, "suggested_content": str, "reasoning": str
             return None
         
         try:
-            content = response.content
-            if "```json" in content:
-                start = content.find("```json") + 7
-                end = content.find("```", start)
-                content = content[start:end].strip()
-            
-            result = json.loads(content)
+            result = _extract_json(response.content)
             if result.get("should_update"):
                 return result.get("suggested_content")
         except:
@@ -597,7 +1140,8 @@ Return JSON: {{"should_update": bool, "suggested_content": str, "reasoning": str
     def analyze_codebase(self, project_path: str) -> str:
         """Analyze codebase using Claude CLI."""
         analysis_prompt = f"Analyze the following project structure and provide a high-level summary: {project_path}"
-        response = self.execute(analysis_prompt)
+        # The prompt names only the path, so a cached answer would go stale
+        response = self.execute(analysis_prompt, no_cache=True)
         return response.content if response.success else "Analysis failed."
 
 
@@ -5,16 +5,32 @@ Validates project structure, dependencies, and environment before execution.
 """
 
 import os
+import re
 import sys
+import importlib.util
 import subprocess
 import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from dataclasses import dataclass, field
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Files that mark the root of a project
+PROJECT_INDICATORS = frozenset({
+    "package.json",
+    "requirements.txt",
+    "pyproject.toml",
+    "Cargo.toml",
+    "go.mod",
+    "pom.xml",
+})
+
+# A PAT assignment line in .env.local, matched over the raw bytes
+_PAT_LINE = re.compile(rb"^[ \t]*(?:QODER_PERSONAL_ACCESS_TOKEN|qoder_pat)[ \t]*=", re.MULTILINE)
+
 
 @dataclass
 class ValidationIssue:
@@ -96,22 +112,30 @@ class PreFlightValidator:
         self.project_dir = project_dir
         self.config = config
         self.report = ValidationReport(passed=True)
+        
+        # CLI probes started ahead of the checks that report on them
+        self._probes: Dict[str, Future] = {}
     
     def validate_all(self) -> ValidationReport:
         """Run all validation checks."""
         logger.info("Running pre-flight validation...")
         
-        if self.config.validation.check_git:
-            self._validate_git()
-        
-        if self.config.validation.check_qoder_cli:
-            self._validate_qoder_cli()
-        
-        if self.config.validation.check_dependencies:
-            self._validate_dependencies()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self._start_probes(executor)
+            
+            if self.config.validation.check_git:
+                self._validate_git()
+            
+            if self.config.validation.check_qoder_cli:
+                self._validate_qoder_cli()
+            
+            if self.config.validation.check_dependencies:
+                self._validate_dependencies()
+            
+            self._validate_project_structure()
+            self._validate_qoder_context()
         
-        self._validate_project_structure()
-        self._validate_qoder_context()
+        self._probes.clear()
         
         # Fail on warnings if configured
         if self.config.validation.fail_on_warnings and self.report.get_warnings():
@@ -119,6 +143,57 @@ class PreFlightValidator:
         
         return self.report
     
+    def _start_probes(self, executor: ThreadPoolExecutor):
+        """
+        Launch the independent CLI probes concurrently.
+        
+        Each probe costs a fork/exec; running them together makes validation
+        wait for the slowest probe instead of their sum. Results are still
+        reported in check order.
+        
+        Args:
+            executor: Executor to run the probes on
+        """
+        cwd = str(self.project_dir)
+        
+        if self.config.validation.check_git and shutil.which("git"):
+            self._probes["git_status"] = executor.submit(
+                self._run_probe, ["git", "status", "--porcelain"], cwd
+            )
+        
+        if self.config.validation.check_qoder_cli and shutil.which("qoder"):
+            self._probes["qoder_version"] = executor.submit(
+                self._run_probe, ["qoder", "--version"]
+            )
+    
+    @staticmethod
+    def _run_probe(cmd: List[str], cwd: Optional[str] = None) -> subprocess.CompletedProcess:
+        """Run a probe command, raising CalledProcessError on failure."""
+        return subprocess.run(
+            cmd,
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    
+    def _probe(self, name: str, cmd: List[str], cwd: Optional[str] = None) -> subprocess.CompletedProcess:
+        """
+        Get a probe result, running the command now if it was not started.
+        
+        Args:
+            name: Probe name used by _start_probes
+            cmd: Command to run
+            cwd: Working directory
+            
+        Returns:
+            Completed process (raises CalledProcessError on failure)
+        """
+        future = self._probes.pop(name, None)
+        if future is not None:
+            return future.result()
+        return self._run_probe(cmd, cwd)
+    
     def _validate_git(self):
         """Validate git repository."""
         # Check if git is installed
@@ -131,16 +206,7 @@ class PreFlightValidator:
             return
         
         # Check if we're in a git repository
-        try:
-            result = subprocess.run(
-                ["git", "rev-parse", "--git-dir"],
-                cwd=str(self.project_dir),
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            self.report.add_info("git", "Git repository detected")
-        except subprocess.CalledProcessError:
+        if self._find_git_dir() is None:
             if self.config.rollback.enabled:
                 self.report.add_error(
                     "git",
@@ -155,15 +221,11 @@ class PreFlightValidator:
                 )
             return
         
+        self.report.add_info("git", "Git repository detected")
+        
         # Check for uncommitted changes
         try:
-            result = subprocess.run(
-                ["git", "status", "--porcelain"],
-                cwd=str(self.project_dir),
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            result = self._probe("git_status", ["git", "status", "--porcelain"], str(self.project_dir))
             
             if result.stdout.strip():
                 self.report.add_warning(
@@ -174,6 +236,29 @@ class PreFlightValidator:
         except subprocess.CalledProcessError:
             pass
     
+    def _find_git_dir(self) -> Optional[Path]:
+        """
+        Locate the enclosing repository's .git entry without spawning git.
+        
+        Returns:
+            Path to .git (a directory, or a file for worktrees and
+            submodules), or None if not inside a repository
+        """
+        # GIT_DIR overrides discovery; let git itself resolve it
+        if "GIT_DIR" in os.environ:
+            try:
+                self._run_probe(["git", "rev-parse", "--git-dir"], str(self.project_dir))
+                return Path(os.environ["GIT_DIR"])
+            except subprocess.CalledProcessError:
+                return None
+        
+        start = self.project_dir.resolve()
+        for directory in (start, *start.parents):
+            git_dir = directory / ".git"
+            if git_dir.exists():
+                return git_dir
+        return None
+    
     def _validate_qoder_cli(self):
         """Validate Qoder CLI installation."""
         if not shutil.which("qoder"):
@@ -186,12 +271,7 @@ class PreFlightValidator:
         
         # Check version
         try:
-            result = subprocess.run(
-                ["qoder", "--version"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            result = self._probe("qoder_version", ["qoder", "--version"])
             version = result.stdout.strip()
             self.report.add_info("qoder", f"Qoder CLI version: {version}")
         except subprocess.CalledProcessError as e:
@@ -204,16 +284,12 @@ class PreFlightValidator:
         
         # Check for PAT
         env_file = self.project_dir / ".env.local"
-        pat_found = False
         
-        if env_file.exists():
-            with open(env_file, 'r') as f:
-                for line in f:
-                    if "=" in line:
-                        key = line.split("=", 1)[0].strip()
-                        if key in ["QODER_PERSONAL_ACCESS_TOKEN", "qoder_pat"]:
-                            pat_found = True
-                            break
+        # One regex scan over the bytes instead of decoding line by line
+        try:
+            pat_found = _PAT_LINE.search(env_file.read_bytes()) is not None
+        except FileNotFoundError:
+            pat_found = False
         
         if not pat_found:
             self.report.add_warning(
@@ -237,11 +313,15 @@ class PreFlightValidator:
         elif self.config.llm.provider == "anthropic":
             required_packages["anthropic"] = "anthropic"
         
+        # find_spec locates a package without running it (importing
+        # sentence_transformers alone takes seconds and loads torch)
         missing = []
         for import_name, package_name in required_packages.items():
             try:
-                __import__(import_name)
-            except ImportError:
+                found = importlib.util.find_spec(import_name) is not None
+            except (ImportError, ValueError):
+                found = False
+            if not found:
                 missing.append(package_name)
         
         if missing:
@@ -251,10 +331,46 @@ class PreFlightValidator:
                 f"Run: pip install {' '.join(missing)}"
             )
     
+    @staticmethod
+    def _list_names(directory: Path) -> Optional[Set[str]]:
+        """
+        List a directory's entry names with a single scandir pass.
+        
+        Args:
+            directory: Directory to list
+            
+        Returns:
+            Set of entry names, or None if the directory does not exist
+        """
+        try:
+            with os.scandir(directory) as entries:
+                return {entry.name for entry in entries}
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+    
+    @staticmethod
+    def _count_markdown(directory: Path) -> Optional[int]:
+        """
+        Count the .md files in a directory.
+        
+        Args:
+            directory: Directory to scan
+            
+        Returns:
+            Number of .md files, or None if the directory does not exist
+        """
+        try:
+            with os.scandir(directory) as entries:
+                return sum(1 for entry in entries if entry.name.endswith(".md") and entry.is_file())
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+    
     def _validate_project_structure(self):
         """Validate basic project structure."""
+        names = self._list_names(self.project_dir)
+        
         # Check if project directory exists
-        if not self.project_dir.exists():
+        if names is None:
             self.report.add_error(
                 "structure",
                 f"Project directory does not exist: {self.project_dir}",
@@ -263,18 +379,7 @@ class PreFlightValidator:
             return
         
         # Check for common project indicators
-        indicators = [
-            "package.json",
-            "requirements.txt",
-            "pyproject.toml",
-            "Cargo.toml",
-            "go.mod",
-            "pom.xml",
-        ]
-        
-        has_indicator = any((self.project_dir / ind).exists() for ind in indicators)
-        
-        if not has_indicator:
+        if names.isdisjoint(PROJECT_INDICATORS):
             self.report.add_warning(
                 "structure",
                 "No common project files detected",
@@ -284,8 +389,9 @@ class PreFlightValidator:
     def _validate_qoder_context(self):
         """Validate Qoder context structure."""
         qoder_dir = self.project_dir / ".qoder"
+        qoder_names = self._list_names(qoder_dir)
         
-        if not qoder_dir.exists():
+        if qoder_names is None:
             self.report.add_warning(
                 "structure",
                 ".qoder directory not found",
@@ -294,11 +400,10 @@ class PreFlightValidator:
             return
         
         # Check for wiki
-        wiki_dir = qoder_dir / "wiki"
-        if not wiki_dir.exists():
+        if "wiki" not in qoder_names:
             self.report.add_info("structure", "No wiki directory found")
         else:
-            wiki_count = len(list(wiki_dir.glob("*.md")))
+            wiki_count = self._count_markdown(qoder_dir / "wiki") or 0
             if wiki_count == 0:
                 self.report.add_info("structure", "Wiki directory is empty")
             else:
@@ -306,40 +411,41 @@ class PreFlightValidator:
         
         # Check for skills
         skills_dir = qoder_dir / "skills"
-        if not skills_dir.exists():
+        if "skills" not in qoder_names:
             self.report.add_info("structure", "No skills directory found")
         else:
-            skill_count = len([d for d in skills_dir.iterdir() if d.is_dir() and (d / "SKILL.md").exists()])
+            with os.scandir(skills_dir) as entries:
+                skill_count = sum(
+                    1 for entry in entries
+                    if entry.is_dir() and os.path.exists(os.path.join(entry.path, "SKILL.md"))
+                )
             if skill_count == 0:
                 self.report.add_info("structure", "Skills directory is empty")
             else:
                 self.report.add_info("structure", f"Found {skill_count} skills")
         
         # Check for rules
-        rules_file = qoder_dir / "rules.md"
-        if not rules_file.exists():
+        if "rules.md" not in qoder_names:
             self.report.add_info("structure", "No rules.md found")
         else:
             self.report.add_info("structure", "Found rules.md")
         
         # Validate subagents directory
-        subagents_dir = self.project_dir / "subagents"
-        if not subagents_dir.exists():
+        subagent_count = self._count_markdown(self.project_dir / "subagents")
+        if subagent_count is None:
             self.report.add_warning(
                 "structure",
                 "No subagents directory found",
                 "Create subagents/ directory with .md files for each subagent"
             )
+        elif subagent_count == 0:
+            self.report.add_warning(
+                "structure",
+                "Subagents directory is empty",
+                "Add subagent definitions as .md files"
+            )
         else:
-            subagent_count = len(list(subagents_dir.glob("*.md")))
-            if subagent_count == 0:
-                self.report.add_warning(
-                    "structure",
-                    "Subagents directory is empty",
-                    "Add subagent definitions as .md files"
-                )
-            else:
-                self.report.add_info("structure", f"Found {subagent_count} subagents")
+            self.report.add_info("structure", f"Found {subagent_count} subagents")
 
 
 def validate_project(project_dir: Path, config: Any) -> ValidationReport:
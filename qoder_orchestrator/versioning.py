@@ -4,15 +4,119 @@ Context versioning and dependency fingerprinting.
 Tracks which versions of wiki/skills were used for each task.
 """
 
+import os
+import atexit
 import hashlib
 import json
+import tempfile
+import threading
+import time
+import weakref
 from pathlib import Path
-from typing import Dict, Optional, Set
+from typing import Any, BinaryIO, Dict, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, asdict
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# File digests feed fingerprints callers compare across runs, so they use
+# one fixed algorithm; the name tags the persisted digest cache
+_file_hasher = hashlib.sha256
+_FILE_HASH_NAME = "sha256"
+
+# orjson is optional; it encodes the version records several times faster
+try:
+    import orjson
+    
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj: Any, pretty: bool = False) -> bytes:
+        option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS if pretty else 0
+        return orjson.dumps(obj, option=option)
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps(obj: Any, pretty: bool = False) -> bytes:
+        if pretty:
+            return json.dumps(obj, indent=2, sort_keys=True).encode()
+        return json.dumps(obj).encode()
+
+# ijson is optional; it streams records off disk without parsing the
+# whole file into one dict first
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+_HASH_CHUNK_SIZE = 256 * 1024
+
+# One read buffer per hashing thread, reused across files
+_read_buffers = threading.local()
+
+# Files modified this recently are not cached: a write within the same
+# mtime tick would otherwise go unnoticed
+_RACY_MTIME_WINDOW_NS = 2 * 10**9
+
+# Full rewrites of context_versions.json happen every this many records;
+# records in between go to an append-only log
+_SAVE_EVERY = 16
+
+# Below this many files, thread startup costs more than it saves
+_PARALLEL_HASH_MIN_FILES = 8
+
+# Same for in-memory wiki pages and skills, by total size
+_PARALLEL_TEXT_HASH_MIN_CHARS = 4 * 1024 * 1024
+
+# Permissions for newly written files: mkstemp creates 0600, so temp files
+# are chmodded to what open() would have produced before being renamed
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+def _hash_file(f: BinaryIO) -> bytes:
+    """Hash an open binary file in chunks without reading it into memory."""
+    if hasattr(hashlib, "file_digest"):  # Python 3.11+
+        return hashlib.file_digest(f, _file_hasher).digest()
+    
+    hasher = _file_hasher()
+    buffer = getattr(_read_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _read_buffers.buffer = bytearray(_HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    while True:
+        size = f.readinto(buffer)
+        if not size:
+            break
+        hasher.update(view[:size])
+    return hasher.digest()
+
+
+def _write_atomic(path: Path, payload: bytes):
+    """Write a file via a temp file and rename so readers never see partial data."""
+    try:
+        mode = os.stat(path).st_mode & 0o7777  # Keep the replaced file's mode
+    except FileNotFoundError:
+        mode = _NEW_FILE_MODE
+    
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@lru_cache(maxsize=512)
+def _hash_names(names: Tuple[str, ...]) -> str:
+    """SHA256 of a sorted name list; tasks in a stage often share the same lists."""
+    return hashlib.sha256(json.dumps(list(names)).encode()).hexdigest()
+
 
 @dataclass
 class ContextVersion:
@@ -21,6 +125,7 @@ class ContextVersion:
     skill_hashes: Dict[str, str] = field(default_factory=dict)
     rules_hash: Optional[str] = None
     timestamp: float = 0.0
+    root_hash: Optional[str] = None
 
 
 @dataclass
@@ -44,24 +149,81 @@ class VersionTracker:
         """
         self.project_dir = project_dir
         self.version_file = project_dir / "specs" / "context_versions.json"
+        self.log_file = project_dir / "specs" / "context_versions.log"
         self.task_versions: Dict[str, TaskVersionRecord] = {}
+        
+        # Tasks recorded (and logged) since the last full save
+        self._unsaved_tasks: Set[str] = set()
+        
+        # Reverse indexes from context item to the tasks that used it
+        self._wiki_to_tasks: Dict[str, Set[str]] = {}
+        self._skill_to_tasks: Dict[str, Set[str]] = {}
+        self._rules_tasks: Set[str] = set()
+        
+        # path -> (mtime_ns, size, raw digest), to skip re-hashing unchanged
+        # files; digests are hex only in the persisted file
+        self.file_hash_cache_file = project_dir / "specs" / "file_hash_cache.json"
+        self._file_hash_cache: Dict[str, Tuple[int, int, bytes]] = {}
+        self._file_hash_cache_dirty = False
+        
+        # Document key ("w:<page>", "s:<skill>" or "r") -> (content, digest)
+        # of its last hash; tasks capture the same pages over and over, and
+        # an unchanged page compares equal without rehashing
+        self._text_hashes: Dict[str, Tuple[str, str]] = {}
+        
         self._load()
+        self._load_file_hash_cache()
+        _live_trackers.add(self)
     
     def _compute_hash(self, content: str) -> str:
         """Compute SHA256 hash of content."""
         return hashlib.sha256(content.encode()).hexdigest()
     
-    def _compute_file_hash(self, file_path: Path) -> Optional[str]:
-        """Compute hash of file content."""
-        if not file_path.exists():
+    def _hash_document(self, key: str, content: str) -> str:
+        """SHA256 of a named document, reused while its content is unchanged."""
+        cached = self._text_hashes.get(key)
+        if cached is not None and (cached[0] is content or cached[0] == content):
+            return cached[1]
+        
+        digest = self._compute_hash(content)
+        self._text_hashes[key] = (content, digest)
+        return digest
+    
+    def _hash_list(self, items: list) -> str:
+        """Order-independent SHA256 of a list of names, duplicates included."""
+        return _hash_names(tuple(sorted(map(str, items))))
+    
+    def _compute_file_hash(self, file_path: Path) -> Optional[bytes]:
+        """Compute raw SHA-256 digest of file content."""
+        key = str(file_path)
+        
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Failed to hash file {file_path}: {e}")
             return None
         
+        cached = self._file_hash_cache.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+        
+        # Unbuffered: reads go straight into the hash buffer
         try:
-            with open(file_path, 'rb') as f:
-                return hashlib.sha256(f.read()).hexdigest()
+            with open(file_path, 'rb', buffering=0) as f:
+                digest = _hash_file(f)
+        except FileNotFoundError:
+            return None
         except Exception as e:
             logger.warning(f"Failed to hash file {file_path}: {e}")
             return None
+        
+        if time.time_ns() - st.st_mtime_ns > _RACY_MTIME_WINDOW_NS:
+            self._file_hash_cache[key] = (st.st_mtime_ns, st.st_size, digest)
+            self._file_hash_cache_dirty = True
+        
+        return digest
     
     def capture_context_version(
         self,
@@ -80,24 +242,56 @@ class VersionTracker:
         Returns:
             ContextVersion with hashes
         """
-        import time
-        
-        version = ContextVersion(timestamp=time.time())
-        
-        # Hash wiki pages
-        for name, content in wiki_content.items():
-            version.wiki_hashes[name] = self._compute_hash(content)
-        
-        # Hash skills
-        for name, content in skills.items():
-            version.skill_hashes[name] = self._compute_hash(content)
+        version = ContextVersion(
+            wiki_hashes=self._hash_contents(wiki_content, "w:"),
+            skill_hashes=self._hash_contents(skills, "s:"),
+            timestamp=time.time()
+        )
         
         # Hash rules
         if rules:
-            version.rules_hash = self._compute_hash(rules)
+            version.rules_hash = self._hash_document("r", rules)
+        
+        version.root_hash = self._compute_root_hash(version)
         
         return version
     
+    def _hash_contents(self, contents: Dict[str, str], prefix: str) -> Dict[str, str]:
+        """
+        Hash each named document.
+        
+        Args:
+            contents: Dictionary of name to content
+            prefix: Namespace of the names in the document hash memo
+            
+        Returns:
+            Dictionary of name to content hash
+        """
+        keys = {name: prefix + name for name in contents}
+        stale = {
+            name: content for name, content in contents.items()
+            if keys[name] not in self._text_hashes
+            or self._text_hashes[keys[name]][0] is not content
+        }
+        
+        # SHA-256 releases the GIL on large inputs, so big page sets hash
+        # across cores; small ones are cheaper in a plain loop
+        if len(stale) > 1 and sum(map(len, stale.values())) >= _PARALLEL_TEXT_HASH_MIN_CHARS:
+            workers = min(os.cpu_count() or 1, len(stale))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                digests = executor.map(self._compute_hash, stale.values())
+                for name, digest in zip(stale, digests):
+                    self._text_hashes[keys[name]] = (stale[name], digest)
+        
+        return {name: self._hash_document(keys[name], content) for name, content in contents.items()}
+    
+    def _compute_root_hash(self, version: ContextVersion) -> str:
+        """Hash all wiki, skill and rules hashes into one comparable digest."""
+        lines = [f"w:{name}={digest}\n" for name, digest in sorted(version.wiki_hashes.items())]
+        lines.extend(f"s:{name}={digest}\n" for name, digest in sorted(version.skill_hashes.items()))
+        lines.append(f"r:{version.rules_hash}")
+        return self._compute_hash("".join(lines))
+    
     def record_task_version(
         self,
         task_id: str,
@@ -115,8 +309,8 @@ class VersionTracker:
             files_scope: Files in task scope
         """
         # Hash dependencies and files
-        deps_hash = self._compute_hash(json.dumps(sorted(dependencies)))
-        files_hash = self._compute_hash(json.dumps(sorted(files_scope)))
+        deps_hash = self._hash_list(dependencies)
+        files_hash = self._hash_list(files_scope)
         
         record = TaskVersionRecord(
             task_id=task_id,
@@ -125,8 +319,15 @@ class VersionTracker:
             files_hash=files_hash
         )
         
+        self._unindex_task(task_id)
         self.task_versions[task_id] = record
-        self._save()
+        self._index_task(task_id, context_version)
+        
+        # Append to the log now and rewrite the full file only every
+        # _SAVE_EVERY records, instead of rewriting it per task
+        self._append_log(record)
+        if len(self._unsaved_tasks) >= _SAVE_EVERY:
+            self._save()
         
         logger.debug(f"Recorded context version for task {task_id}")
     
@@ -150,6 +351,10 @@ class VersionTracker:
         
         old_version = self.task_versions[task_id].context_version
         
+        # One comparison when both sides carry a root hash
+        if old_version.root_hash and current_version.root_hash:
+            return old_version.root_hash != current_version.root_hash
+        
         # Check wiki changes
         if old_version.wiki_hashes != current_version.wiki_hashes:
             return True
@@ -181,27 +386,43 @@ class VersionTracker:
         Returns:
             Set of affected task IDs
         """
-        affected = set()
+        affected: Set[str] = set()
+        wiki_index = self._wiki_to_tasks
+        skill_index = self._skill_to_tasks
         
-        for task_id, record in self.task_versions.items():
-            version = record.context_version
-            
-            # Check if task used changed wiki pages
-            if any(wiki in version.wiki_hashes for wiki in changed_wiki):
-                affected.add(task_id)
-                continue
-            
-            # Check if task used changed skills
-            if any(skill in version.skill_hashes for skill in changed_skills):
-                affected.add(task_id)
-                continue
-            
-            # Check if rules changed (affects all tasks)
-            if rules_changed and version.rules_hash:
-                affected.add(task_id)
+        # Tasks that used changed wiki pages
+        affected.update(*(wiki_index[wiki] for wiki in changed_wiki if wiki in wiki_index))
+        
+        # Tasks that used changed skills
+        affected.update(*(skill_index[skill] for skill in changed_skills if skill in skill_index))
+        
+        # Rules changes affect every task that had rules
+        if rules_changed:
+            affected.update(self._rules_tasks)
         
         return affected
     
+    def _index_task(self, task_id: str, version: ContextVersion):
+        """Add a task to the reverse context indexes."""
+        for wiki in version.wiki_hashes:
+            self._wiki_to_tasks.setdefault(wiki, set()).add(task_id)
+        for skill in version.skill_hashes:
+            self._skill_to_tasks.setdefault(skill, set()).add(task_id)
+        if version.rules_hash:
+            self._rules_tasks.add(task_id)
+    
+    def _unindex_task(self, task_id: str):
+        """Remove a task's previous record from the reverse context indexes."""
+        record = self.task_versions.get(task_id)
+        if record is None:
+            return
+        
+        for wiki in record.context_version.wiki_hashes:
+            self._wiki_to_tasks.get(wiki, set()).discard(task_id)
+        for skill in record.context_version.skill_hashes:
+            self._skill_to_tasks.get(skill, set()).discard(task_id)
+        self._rules_tasks.discard(task_id)
+    
     def compute_file_fingerprint(self, file_paths: list) -> str:
         """
         Compute fingerprint for a set of files.
@@ -212,16 +433,24 @@ class VersionTracker:
         Returns:
             Combined hash of all files
         """
-        hashes = []
+        paths = [self.project_dir / file_path for file_path in sorted(file_paths)]
         
-        for file_path in sorted(file_paths):
-            path = self.project_dir / file_path
-            file_hash = self._compute_file_hash(path)
-            if file_hash:
-                hashes.append(file_hash)
+        # Hashing releases the GIL, so threads overlap reads and hashing;
+        # map keeps results in path order for a deterministic fingerprint
+        if len(paths) >= _PARALLEL_HASH_MIN_FILES:
+            workers = min(32, (os.cpu_count() or 1) * 4, len(paths))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                file_hashes = list(executor.map(self._compute_file_hash, paths))
+        else:
+            file_hashes = [self._compute_file_hash(path) for path in paths]
         
-        combined = "|".join(hashes)
-        return self._compute_hash(combined)
+        if self._file_hash_cache_dirty:
+            self._save_file_hash_cache()
+        
+        # Same formula as always, so fingerprints stay comparable across runs
+        return self._compute_hash("|".join(
+            file_hash.hex() for file_hash in file_hashes if file_hash
+        ))
     
     def should_reexecute_task(
         self,
@@ -259,53 +488,215 @@ class VersionTracker:
         return False
     
     def _load(self):
-        """Load version records from disk."""
-        if not self.version_file.exists():
+        """Load version records from disk, then any logged since the last save."""
+        if self.version_file.exists():
+            try:
+                for task_id, record_data in self._iter_saved_records():
+                    self._add_loaded_record(task_id, record_data)
+                
+                logger.info(f"Loaded version records for {len(self.task_versions)} tasks")
+                
+            except Exception as e:
+                logger.warning(f"Failed to load version records: {e}")
+        
+        self._replay_log()
+    
+    def _iter_saved_records(self):
+        """
+        Yield (task_id, record_data) pairs from the version file.
+        
+        Streams with ijson when installed; otherwise parses the file at
+        once but releases each parsed entry as soon as it is consumed.
+        """
+        with open(self.version_file, 'rb') as f:
+            if ijson is not None:
+                yield from ijson.kvitems(f, '', use_float=True)
+                return
+            data = _json_loads(f.read())
+        
+        for task_id in list(data):
+            yield task_id, data.pop(task_id)
+    
+    def _iter_log_records(self):
+        """Yield (task_id, record_data) pairs from the append-only log."""
+        try:
+            with open(self.log_file, 'rb') as f:
+                for line in f:
+                    try:
+                        record_data = _json_loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted append
+                        continue
+                    yield record_data['task_id'], record_data
+        except FileNotFoundError:
+            return
+    
+    def _replay_log(self):
+        """Apply records logged after the last full save (e.g. before a crash)."""
+        if not self.log_file.exists():
+            return
+        
+        replayed = 0
+        try:
+            for task_id, record_data in self._iter_log_records():
+                self._unindex_task(task_id)
+                self._add_loaded_record(task_id, record_data)
+                replayed += 1
+        except Exception as e:
+            logger.warning(f"Failed to replay version log: {e}")
+        
+        # Fold the log into the main file so later appends start clean
+        logger.info(f"Replayed {replayed} logged version records")
+        self._save()
+    
+    def _add_loaded_record(self, task_id: str, record_data: Dict[str, Any]):
+        """Add a record parsed from disk and index it."""
+        context_data = record_data['context_version']
+        context = ContextVersion(
+            wiki_hashes=context_data.get('wiki_hashes', {}),
+            skill_hashes=context_data.get('skill_hashes', {}),
+            rules_hash=context_data.get('rules_hash'),
+            timestamp=context_data.get('timestamp', 0.0),
+            root_hash=context_data.get('root_hash')
+        )
+        
+        self.task_versions[task_id] = TaskVersionRecord(
+            task_id=task_id,
+            context_version=context,
+            dependencies_hash=record_data['dependencies_hash'],
+            files_hash=record_data['files_hash']
+        )
+        self._index_task(task_id, context)
+    
+    @staticmethod
+    def _record_to_dict(record: TaskVersionRecord) -> Dict[str, Any]:
+        """Serializable form of a record, as stored on disk."""
+        return {
+            'task_id': record.task_id,
+            'context_version': asdict(record.context_version),
+            'dependencies_hash': record.dependencies_hash,
+            'files_hash': record.files_hash
+        }
+    
+    def _append_log(self, record: TaskVersionRecord):
+        """Append one record to the log, falling back to a full save on failure."""
+        self._unsaved_tasks.add(record.task_id)
+        try:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_file, 'ab') as f:
+                f.write(_json_dumps(self._record_to_dict(record)) + b"\n")
+        except Exception as e:
+            logger.warning(f"Failed to append version log: {e}")
+            self._save()
+    
+    def flush(self):
+        """Write pending version records and file digests to disk."""
+        if self._unsaved_tasks:
+            self._save()
+        if self._file_hash_cache_dirty:
+            self._save_file_hash_cache()
+    
+    def _save(self):
+        """
+        Save version records to disk.
+        
+        Other trackers on the same project may have saved or logged records
+        since this one loaded, so the file and log are merged in first: the
+        on-disk copy wins except for tasks this tracker recorded itself.
+        """
+        self.version_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        with _save_lock:
+            try:
+                data = {
+                    task_id: self._record_to_dict(record)
+                    for task_id, record in self.task_versions.items()
+                }
+                
+                try:
+                    if self.version_file.exists():
+                        data.update(self._iter_saved_records())
+                    data.update(self._iter_log_records())
+                except Exception as e:
+                    logger.warning(f"Failed to read saved version records for merge: {e}")
+                
+                for task_id in self._unsaved_tasks:
+                    data[task_id] = self._record_to_dict(self.task_versions[task_id])
+                
+                _write_atomic(self.version_file, _json_dumps(data, pretty=True))
+                
+                # The full file now covers everything the log held
+                self.log_file.unlink(missing_ok=True)
+                self._unsaved_tasks.clear()
+                
+                # Pick up records other trackers wrote
+                for task_id, record_data in data.items():
+                    self._unindex_task(task_id)
+                    self._add_loaded_record(task_id, record_data)
+                
+                logger.debug(f"Saved version records for {len(data)} tasks")
+                
+            except Exception as e:
+                logger.warning(f"Failed to save version records: {e}")
+    
+    def _load_file_hash_cache(self):
+        """Load cached file digests, discarding them if the hash algorithm changed."""
+        if not self.file_hash_cache_file.exists():
             return
         
         try:
-            with open(self.version_file, 'r') as f:
+            with open(self.file_hash_cache_file, 'r') as f:
                 data = json.load(f)
             
-            for task_id, record_data in data.items():
-                context_data = record_data['context_version']
-                context = ContextVersion(
-                    wiki_hashes=context_data.get('wiki_hashes', {}),
-                    skill_hashes=context_data.get('skill_hashes', {}),
-                    rules_hash=context_data.get('rules_hash'),
-                    timestamp=context_data.get('timestamp', 0.0)
-                )
-                
-                self.task_versions[task_id] = TaskVersionRecord(
-                    task_id=task_id,
-                    context_version=context,
-                    dependencies_hash=record_data['dependencies_hash'],
-                    files_hash=record_data['files_hash']
-                )
+            if data.get('algorithm') != _FILE_HASH_NAME:
+                return
             
-            logger.info(f"Loaded version records for {len(self.task_versions)} tasks")
+            self._file_hash_cache = {
+                path: (mtime_ns, size, bytes.fromhex(digest))
+                for path, (mtime_ns, size, digest) in data.get('files', {}).items()
+            }
             
         except Exception as e:
-            logger.warning(f"Failed to load version records: {e}")
+            logger.warning(f"Failed to load file hash cache: {e}")
     
-    def _save(self):
-        """Save version records to disk."""
-        self.version_file.parent.mkdir(parents=True, exist_ok=True)
+    def _save_file_hash_cache(self):
+        """Save cached file digests to disk."""
+        self.file_hash_cache_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Drop digests of files that have since been deleted or renamed
+        missing = [path for path in self._file_hash_cache if not os.path.exists(path)]
+        for path in missing:
+            del self._file_hash_cache[path]
         
         try:
-            data = {}
-            for task_id, record in self.task_versions.items():
-                data[task_id] = {
-                    'task_id': task_id,
-                    'context_version': asdict(record.context_version),
-                    'dependencies_hash': record.dependencies_hash,
-                    'files_hash': record.files_hash
+            data = {
+                'algorithm': _FILE_HASH_NAME,
+                'files': {
+                    path: (mtime_ns, size, digest.hex())
+                    for path, (mtime_ns, size, digest) in self._file_hash_cache.items()
                 }
+            }
             
-            with open(self.version_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            _write_atomic(self.file_hash_cache_file, _json_dumps(data))
             
-            logger.debug(f"Saved version records for {len(self.task_versions)} tasks")
+            self._file_hash_cache_dirty = False
             
         except Exception as e:
-            logger.warning(f"Failed to save version records: {e}")
+            logger.warning(f"Failed to save file hash cache: {e}")
+
+
+# Serializes merge-and-write of version files between trackers in this process
+_save_lock = threading.Lock()
+
+# Trackers whose logged records are written out at exit; weak references so
+# registering does not keep trackers alive
+_live_trackers: "weakref.WeakSet[VersionTracker]" = weakref.WeakSet()
+
+
+def _flush_trackers():
+    """Flush every live tracker at interpreter exit."""
+    for tracker in list(_live_trackers):
+        tracker.flush()
+
+
+atexit.register(_flush_trackers)